@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Hashable, List, Optional
+
+from coordination import worker_id
+
+logger = logging.getLogger(__name__)
+
+ALL = None
+# Publishers take a sequence number before inserting, so inserts can land
+# slightly out of order; resuming re-reads this many events and dedupes them.
+RESUME_WINDOW = 64
+NAMESPACE_EXISTS = 48
+
+
+class EntityCache:
+    """Small in-process LRU keyed by (entity, key) with a TTL as a safety net."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: OrderedDict = OrderedDict()
+        self.version = 0
+
+    def get(self, entity: str, key: Hashable) -> Any:
+        entry = self.entries.get((entity, key))
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self.entries[(entity, key)]
+            return None
+        self.entries.move_to_end((entity, key))
+        return value
+
+    def set(self, entity: str, key: Hashable, value: Any, version: Optional[int] = None):
+        """Store ``value`` unless the cache was invalidated after ``version`` was read."""
+        if version is not None and version != self.version:
+            return
+        self.entries[(entity, key)] = (value, time.monotonic() + self.ttl)
+        self.entries.move_to_end((entity, key))
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, entity: str, key: Optional[Hashable] = ALL):
+        self.version += 1
+        if key is ALL:
+            for cached in [k for k in self.entries if k[0] == entity]:
+                del self.entries[cached]
+        else:
+            self.entries.pop((entity, key), None)
+
+    def clear(self):
+        self.version += 1
+        self.entries.clear()
+
+
+class InvalidationBus:
+    """Cross-worker cache invalidation over a capped collection.
+
+    Every worker tails the collection with a tailable-await cursor and applies
+    events published by the others. Events carry a sequence number so a worker
+    that fell behind the capped collection's rollover, or lost its cursor, can
+    tell it missed events and flush everything instead.
+    """
+
+    def __init__(self, db, collection: str = "cache_invalidations", max_events: int = 10000,
+                 max_await_ms: int = 250, retry_interval: float = 1.0):
+        self.db = db
+        self.collection_name = collection
+        self.max_events = max_events
+        self.max_await_ms = max_await_ms
+        self.retry_interval = retry_interval
+        self.origin = worker_id()
+        self.handlers: List[Callable[[str, Optional[str]], None]] = []
+        self.flush_handlers: List[Callable[[], None]] = []
+        self.last_seq: Optional[int] = None
+        self.seen: deque = deque(maxlen=RESUME_WINDOW * 4)
+        self.applied = 0
+        self.recoveries = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+
+    @property
+    def collection(self):
+        # Resolved per use so a lazily created database is not touched at construction
+        return self.db[self.collection_name]
+
+    def subscribe(self, handler: Callable[[str, Optional[str]], None], on_flush: Callable[[], None]):
+        self.handlers.append(handler)
+        self.flush_handlers.append(on_flush)
+
+    def _apply(self, entity: str, entity_id: Optional[str]):
+        for handler in self.handlers:
+            handler(entity, entity_id)
+
+    def _flush(self):
+        self.recoveries += 1
+        for handler in self.flush_handlers:
+            handler()
+
+    async def ensure_collection(self):
+        from pymongo.errors import CollectionInvalid, OperationFailure
+
+        try:
+            await self.db.create_collection(
+                self.collection_name, capped=True, size=self.max_events * 256, max=self.max_events
+            )
+        except CollectionInvalid:
+            pass
+        except OperationFailure as error:
+            # Another worker created it between pymongo's existence check and the create
+            if error.code != NAMESPACE_EXISTS:
+                raise
+
+    async def publish(self, entity: str, entity_id: Optional[str] = None):
+        from pymongo import ReturnDocument
+
+        # Apply locally first so the writing worker reads its own writes
+        self._apply(entity, entity_id)
+        counter = await self.db.counters.find_one_and_update(
+            {"_id": self.collection_name},
+            {"$inc": {"seq": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        await self.collection.insert_one({
+            "seq": counter["seq"],
+            "entity": entity,
+            "entity_id": entity_id,
+            "origin": self.origin,
+            "published_at": datetime.now(timezone.utc),
+        })
+
+    def _receive(self, event: dict):
+        seq = event.get("seq", 0)
+        if seq in self.seen:
+            return
+        self.seen.append(seq)
+        self.last_seq = max(self.last_seq or 0, seq)
+        if event.get("origin") == self.origin or event.get("entity") is None:
+            return
+        self._apply(event["entity"], event.get("entity_id"))
+        self.applied += 1
+        published_at = event["published_at"].replace(tzinfo=timezone.utc)
+        lag = (datetime.now(timezone.utc) - published_at).total_seconds()
+        self.lag_total += lag
+        self.lag_max = max(self.lag_max, lag)
+
+    async def _resume_point(self) -> int:
+        oldest = await self.collection.find_one({}, sort=[("$natural", 1)])
+        newest = await self.collection.find_one({}, sort=[("$natural", -1)])
+        resume_after = (self.last_seq or 0) - RESUME_WINDOW
+        if self.last_seq is None:
+            # First start: nothing cached yet, so begin after the newest event
+            self.last_seq = resume_after = newest["seq"] if newest else 0
+        elif oldest is None or oldest["seq"] > self.last_seq + 1:
+            logger.warning("Missed cache invalidations after seq %s, flushing caches", self.last_seq)
+            self._flush()
+            self.last_seq = newest["seq"] if newest else self.last_seq
+        if newest is None:
+            # A tailable cursor on an empty capped collection dies immediately
+            await self.collection.insert_one({"seq": 0, "entity": None, "published_at": datetime.now(timezone.utc)})
+        return resume_after
+
+    async def run(self):
+        from pymongo import CursorType
+
+        while True:
+            try:
+                await self.ensure_collection()
+                resume_after = await self._resume_point()
+                cursor = self.collection.find(
+                    {"seq": {"$gt": resume_after}},
+                    cursor_type=CursorType.TAILABLE_AWAIT,
+                ).max_await_time_ms(self.max_await_ms)
+                while cursor.alive:
+                    async for event in cursor:
+                        self._receive(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Never let the task die: a worker that stops tailing serves stale caches forever
+                logger.exception("Invalidation cursor failed, resuming")
+            await asyncio.sleep(self.retry_interval)
+
+    def metrics(self) -> dict:
+        return {
+            "last_seq": self.last_seq,
+            "applied": self.applied,
+            "recoveries": self.recoveries,
+            "lag_avg": self.lag_total / self.applied if self.applied else 0.0,
+            "lag_max": self.lag_max,
+        }
@@ -0,0 +1,174 @@
+import gzip
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+UNBUFFERED_TYPES = ("text/event-stream",)
+
+# Dynamic bodies are compressed per request, so favour speed; cached catalog
+# bodies are compressed once per catalog version, so favour size.
+LEVELS = {
+    "dynamic": {"br": 4, "gzip": 6},
+    "cached": {"br": 9, "gzip": 9},
+}
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """The supported coding with the highest q-value; brotli wins ties."""
+    offered = {}
+    for part in accept_encoding.split(","):
+        coding, *params = part.strip().split(";")
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        offered[coding.strip().lower()] = quality
+    wildcard = offered.get("*", 0.0)
+    supported = ("br", "gzip") if brotli is not None else ("gzip",)
+    best = max(supported, key=lambda coding: offered.get(coding, wildcard))
+    return best if offered.get(best, wildcard) > 0 else None
+
+
+def compress(body: bytes, encoding: str, mode: str) -> bytes:
+    level = LEVELS[mode][encoding]
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+class CompressionStats:
+    def __init__(self):
+        self.responses = 0
+        self.cache_hits = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+    def metrics(self) -> dict:
+        return {
+            "responses": self.responses,
+            "cache_hits": self.cache_hits,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": self.bytes_out / self.bytes_in if self.bytes_in else 0.0,
+            "cpu_seconds": self.cpu_seconds,
+        }
+
+
+class CompressionMiddleware:
+    """gzip/brotli response compression with a compressed-body cache.
+
+    Responses for which ``cacheable(scope)`` is true must be identical for
+    every user; their compressed bytes are kept per (path, query, encoding)
+    and reused until ``cache_version()`` changes.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024,
+                 cacheable: Callable[[dict], bool] = lambda scope: False,
+                 cache_version: Callable[[], int] = lambda: 0,
+                 max_cached: int = 256,
+                 stats: Optional[CompressionStats] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cacheable = cacheable
+        self.cache_version = cache_version
+        self.max_cached = max_cached
+        self.cache: OrderedDict = OrderedDict()
+        self.stats = stats or CompressionStats()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        encoding = negotiate_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        cache_key = None
+        version = self.cache_version()
+        if scope["method"] == "GET" and self.cacheable(scope):
+            cache_key = (scope["path"], scope.get("query_string", b""), encoding)
+            cached = self.cache.get(cache_key)
+            if cached and cached[0] == version:
+                self.cache.move_to_end(cache_key)
+                self.stats.responses += 1
+                self.stats.cache_hits += 1
+                await send({"type": "http.response.start", "status": 200, "headers": cached[1]})
+                await send({"type": "http.response.body", "body": cached[2]})
+                return
+
+        responder = _BufferedResponder(send)
+        await self.app(scope, receive, responder)
+        if responder.passthrough:
+            return
+
+        body = bytes(responder.body)
+        if len(body) < self.minimum_size:
+            await responder.flush(body, responder.headers)
+            return
+
+        mode = "cached" if cache_key else "dynamic"
+        started = time.process_time()
+        compressed = compress(body, encoding, mode)
+        self.stats.cpu_seconds += time.process_time() - started
+        self.stats.responses += 1
+        self.stats.bytes_in += len(body)
+        self.stats.bytes_out += len(compressed)
+
+        response_headers = [
+            (k, v) for k, v in responder.headers if k.lower() not in (b"content-length", b"vary")
+        ] + [
+            (b"content-encoding", encoding.encode()),
+            (b"vary", b"Accept-Encoding"),
+        ]
+        # Only cache if no catalog write landed while the handler ran
+        if cache_key and responder.status == 200 and self.cache_version() == version:
+            cached_headers = response_headers + [(b"content-length", str(len(compressed)).encode())]
+            self.cache[cache_key] = (version, cached_headers, compressed)
+            self.cache.move_to_end(cache_key)
+            while len(self.cache) > self.max_cached:
+                self.cache.popitem(last=False)
+        await responder.flush(compressed, response_headers)
+
+
+class _BufferedResponder:
+    def __init__(self, send):
+        self.send = send
+        self.status = 200
+        self.headers = []
+        self.body = bytearray()
+        self.passthrough = False
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+            self.headers = list(message.get("headers", []))
+            header_map = {k.lower(): v for k, v in self.headers}
+            content_type = header_map.get(b"content-type", b"").decode("latin-1")
+            if (b"content-encoding" in header_map
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or content_type.startswith(UNBUFFERED_TYPES)):
+                self.passthrough = True
+                await self.send(message)
+        elif self.passthrough:
+            await self.send(message)
+        else:
+            self.body.extend(message.get("body", b""))
+
+    async def flush(self, body: bytes, headers):
+        headers = [(k, v) for k, v in headers if k.lower() != b"content-length"]
+        headers.append((b"content-length", str(len(body)).encode()))
+        await self.send({"type": "http.response.start", "status": self.status, "headers": headers})
+        await self.send({"type": "http.response.body", "body": body})
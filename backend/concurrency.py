@@ -0,0 +1,130 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from starlette.responses import JSONResponse
+
+QUEUE_TIME_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class LimitExceeded(Exception):
+    pass
+
+
+class ConcurrencyLimit:
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = max(1, math.ceil(queue_timeout))
+        self.active = 0
+        self.waiters: deque = deque()
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+        self.queue_time_buckets = [0] * (len(QUEUE_TIME_BUCKETS) + 1)
+
+    def _record_admission(self, waited: float):
+        self.admitted += 1
+        self.queue_time_total += waited
+        self.queue_time_max = max(self.queue_time_max, waited)
+        bucket = next((i for i, bound in enumerate(QUEUE_TIME_BUCKETS) if waited <= bound), len(QUEUE_TIME_BUCKETS))
+        self.queue_time_buckets[bucket] += 1
+
+    async def acquire(self):
+        if self.active < self.max_concurrent and not self.waiters:
+            self.active += 1
+            self._record_admission(0.0)
+            return
+        if len(self.waiters) >= self.max_queue:
+            self.shed_queue_full += 1
+            raise LimitExceeded(self.name)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            # release() can hand us the slot in the same loop iteration the deadline
+            # fires; the slot is ours then, so take it rather than leak it
+            if not waiter.done() or waiter.cancelled():
+                self.shed_timeout += 1
+                raise LimitExceeded(self.name)
+        except asyncio.CancelledError:
+            # The client went away after release() had already handed us the slot
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+        self._record_admission(time.monotonic() - started)
+
+    def release(self):
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                # Hand the slot straight to the next waiter; active stays the same
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def metrics(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "active": self.active,
+            "queued": len(self.waiters),
+            "admitted": self.admitted,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+            "queue_time_avg": self.queue_time_total / self.admitted if self.admitted else 0.0,
+            "queue_time_max": self.queue_time_max,
+            "queue_time_buckets": dict(zip([str(b) for b in QUEUE_TIME_BUCKETS] + ["+Inf"], self.queue_time_buckets)),
+        }
+
+
+def parse_limits(spec: str) -> Dict[str, ConcurrencyLimit]:
+    """Parse ``group=max_concurrent:max_queue:queue_timeout`` entries separated by commas."""
+    limits = {}
+    for entry in filter(None, (e.strip() for e in spec.split(","))):
+        name, _, values = entry.partition("=")
+        max_concurrent, max_queue, queue_timeout = values.split(":")
+        limits[name.strip()] = ConcurrencyLimit(name.strip(), int(max_concurrent), int(max_queue), float(queue_timeout))
+    return limits
+
+
+class ConcurrencyLimitMiddleware:
+    def __init__(self, app, limits: Dict[str, ConcurrencyLimit], classify: Callable[[dict], Optional[str]]):
+        self.app = app
+        self.limits = limits
+        self.classify = classify
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(self.classify(scope)) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await limit.acquire()
+        except LimitExceeded:
+            response = JSONResponse(
+                {"detail": "Server is busy, please retry"},
+                status_code=503,
+                headers={"Retry-After": str(limit.retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limit.release()
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+async def run_with_lease(
+    collection,
+    name: str,
+    version: int,
+    task: Callable[[], Awaitable[None]],
+    lease_seconds: float = 30,
+    poll_interval: float = 0.2,
+    owner: Optional[str] = None,
+) -> bool:
+    """Run ``task`` in exactly one worker per ``version``.
+
+    The worker that takes the lease document runs the task and records the
+    completed version; every other worker waits until that version is recorded
+    or the lease expires, in which case it takes over. Returns True if this
+    worker ran the task.
+    """
+    from pymongo import ReturnDocument
+    from pymongo.errors import DuplicateKeyError
+
+    owner = owner or worker_id()
+    lease = timedelta(seconds=lease_seconds)
+
+    while True:
+        state = await collection.find_one({"_id": name}, {"completed_version": 1})
+        if state and state.get("completed_version", 0) >= version:
+            return False
+
+        now = datetime.now(timezone.utc)
+        try:
+            acquired = await collection.find_one_and_update(
+                {"_id": name, "$or": [{"lease_expires_at": None}, {"lease_expires_at": {"$lt": now}}]},
+                {"$set": {"owner": owner, "lease_expires_at": now + lease}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            acquired = None
+
+        if not acquired:
+            await asyncio.sleep(poll_interval)
+            continue
+
+        logger.info("Worker %s acquired the %s lease", owner, name)
+        renewal = asyncio.create_task(_renew_lease(collection, name, owner, lease))
+        try:
+            await task()
+        except BaseException:
+            await collection.update_one({"_id": name, "owner": owner}, {"$set": {"lease_expires_at": None}})
+            raise
+        finally:
+            renewal.cancel()
+
+        await collection.update_one(
+            {"_id": name, "owner": owner},
+            {"$set": {
+                "completed_version": version,
+                "completed_at": datetime.now(timezone.utc),
+                "lease_expires_at": None,
+            }},
+        )
+        return True
+
+
+async def _renew_lease(collection, name: str, owner: str, lease: timedelta):
+    from pymongo.errors import PyMongoError
+
+    while True:
+        await asyncio.sleep(lease.total_seconds() / 3)
+        try:
+            await collection.update_one(
+                {"_id": name, "owner": owner},
+                {"$set": {"lease_expires_at": datetime.now(timezone.utc) + lease}},
+            )
+        except PyMongoError:
+            # Keep trying: one failed renewal must not let the lease lapse mid-task
+            logger.exception("Could not renew the %s lease, retrying", name)
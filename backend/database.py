@@ -0,0 +1,45 @@
+import os
+
+
+class LazyDatabase:
+    """Stands in for the Motor database until it is first used.
+
+    MONGO_URL and DB_NAME are read, Motor is imported and the client (with its
+    monitor threads) is created on the first collection access, so importing
+    the server module does not touch the network or need the environment.
+    """
+
+    def __init__(self, url_env: str = "MONGO_URL", name_env: str = "DB_NAME"):
+        self.url_env = url_env
+        self.name_env = name_env
+        self._client = None
+        self._database = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from motor.motor_asyncio import AsyncIOMotorClient
+
+            self._client = AsyncIOMotorClient(os.environ[self.url_env])
+        return self._client
+
+    @property
+    def database(self):
+        if self._database is None:
+            self._database = self.client[os.environ[self.name_env]]
+        return self._database
+
+    def __getattr__(self, name: str):
+        # Only reached for names not set in __init__, i.e. collections and database methods
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.database, name)
+
+    def __getitem__(self, name: str):
+        return self.database[name]
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+        self._client = None
+        self._database = None
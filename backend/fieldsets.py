@@ -0,0 +1,86 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+from pydantic import TypeAdapter, create_model
+
+
+class FieldSpec:
+    def __init__(self, annotation: Any, projection: Dict[str, Any], value: Optional[Callable[[dict], Any]] = None):
+        self.annotation = annotation
+        self.projection = projection
+        self.value = value
+
+
+class FieldSelection:
+    """Allow-listed sparse fieldsets for one resource (``?fields=a,b,c``).
+
+    Each allowed field knows its Mongo projection, so only the requested data
+    is read, and the response is validated against a model trimmed to those
+    fields instead of the full resource model.
+    """
+
+    def __init__(self, name: str, fields: Dict[str, FieldSpec], key: str = "id", max_adapters: int = 64):
+        self.name = name
+        self.fields = fields
+        self.key = key
+        self.max_adapters = max_adapters
+        self.adapters: OrderedDict = OrderedDict()
+
+    def parse(self, fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+        if not fields:
+            return None
+        requested = set(f.strip() for f in fields.split(",") if f.strip())
+        unknown = sorted(requested - self.fields.keys())
+        if unknown or not requested:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields for {self.name}: {', '.join(unknown)}. Allowed: {', '.join(self.fields)}"
+            )
+        # Allow-list order, so every spelling of the same selection shares one adapter and cache entry
+        return tuple(f for f in self.fields if f in requested)
+
+    def projection(self, requested: Tuple[str, ...]) -> dict:
+        # The key keeps this an inclusion projection even if only $slice fields are asked for
+        projection = {"_id": 0, self.key: 1}
+        for field in requested:
+            for key, value in self.fields[field].projection.items():
+                # A full projection of a field wins over a $slice of it
+                if projection.get(key) != 1:
+                    projection[key] = value
+        return projection
+
+    def adapter(self, requested: Tuple[str, ...]) -> TypeAdapter:
+        adapter = self.adapters.get(requested)
+        if adapter is None:
+            model = create_model(
+                f"{self.name.title()}Fields",
+                **{field: (Optional[self.fields[field].annotation], None) for field in requested}
+            )
+            adapter = self.adapters[requested] = TypeAdapter(List[model])
+            # Any subset of a public allow-list can be asked for; keep only the recent ones
+            while len(self.adapters) > self.max_adapters:
+                self.adapters.popitem(last=False)
+        self.adapters.move_to_end(requested)
+        return adapter
+
+    def trim(self, requested: Tuple[str, ...], docs: List[dict]) -> list:
+        return self.adapter(requested).validate_python([
+            {
+                field: spec.value(doc) if spec.value else doc.get(field)
+                for field, spec in ((f, self.fields[f]) for f in requested)
+            }
+            for doc in docs
+        ])
+
+    def response(self, requested: Tuple[str, ...], items: list) -> Response:
+        return Response(content=self.adapter(requested).dump_json(items), media_type="application/json")
+
+
+def model_fields(model, exclude: Tuple[str, ...] = ()) -> Dict[str, FieldSpec]:
+    return {
+        name: FieldSpec(info.annotation, {name: 1})
+        for name, info in model.model_fields.items()
+        if name not in exclude
+    }
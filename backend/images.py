@@ -0,0 +1,146 @@
+import asyncio
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import re
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+VARIANT_WIDTHS = (320, 640, 960, 1280)
+DEFAULT_FORMAT = "webp"
+# AVIF's default effort is ~2x slower than speed=8 for little size benefit at these widths
+SAVE_OPTIONS = {"webp": {"quality": 80, "method": 4}, "avif": {"quality": 60, "speed": 8}}
+MAX_UPLOAD_BYTES = 15 * 1024 * 1024
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+IMAGE_URL_PREFIX = "/api/images/"
+LOCAL_IMAGE_URL = re.compile(r"^/api/images/(?P<digest>[0-9a-f]{64})/\d+\.\w+$")
+UNSPLASH_HOST = "images.unsplash.com"
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def variant_formats() -> Tuple[str, ...]:
+    # Pillow is only loaded once an image is actually served or rendered
+    from PIL import features
+
+    return ("webp", "avif") if features.check("avif") else ("webp",)
+
+
+def variant_path(cache_dir: Path, digest: str, width: int, fmt: str) -> Path:
+    return cache_dir / "variants" / digest[:2] / digest / f"{width}.{fmt}"
+
+
+def original_path(cache_dir: Path, digest: str) -> Path:
+    return cache_dir / "originals" / digest[:2] / digest
+
+
+def variant_url(digest: str, width: int, fmt: str = DEFAULT_FORMAT) -> str:
+    return f"{IMAGE_URL_PREFIX}{digest}/{width}.{fmt}"
+
+
+def _write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def render_variants(cache_dir: str, digest: str) -> List[Tuple[int, str, int]]:
+    """Resize one original into every width/format. Runs in a worker process."""
+    from PIL import Image, ImageOps
+
+    cache_dir = Path(cache_dir)
+    with Image.open(original_path(cache_dir, digest)) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ("RGB", "RGBA"):
+            original = original.convert("RGBA" if original.has_transparency_data else "RGB")
+        rendered = []
+        for width in VARIANT_WIDTHS:
+            resized = original.copy()
+            # Never upscale: narrow originals are stored once per width name
+            resized.thumbnail((width, width * 4), Image.LANCZOS)
+            for fmt in variant_formats():
+                path = variant_path(cache_dir, digest, width, fmt)
+                if not path.exists():
+                    buffer = io.BytesIO()
+                    resized.save(buffer, format=fmt.upper(), **SAVE_OPTIONS[fmt])
+                    _write_atomic(path, buffer.getvalue())
+                rendered.append((width, fmt, path.stat().st_size))
+    return rendered
+
+
+class ImagePipeline:
+    def __init__(self, cache_dir: Path, workers: Optional[int] = None):
+        self.cache_dir = Path(cache_dir)
+        self.workers = workers
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.in_flight: Dict[str, Future] = {}
+
+    def store_original(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = original_path(self.cache_dir, digest)
+        if not path.exists():
+            _write_atomic(path, data)
+        return digest
+
+    def has_original(self, digest: str) -> bool:
+        return original_path(self.cache_dir, digest).exists()
+
+    def variant(self, digest: str, width: int, fmt: str) -> Path:
+        return variant_path(self.cache_dir, digest, width, fmt)
+
+    def _start_executor(self) -> ProcessPoolExecutor:
+        # Never fork: the server process holds an event loop and driver threads
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(method))
+
+    def submit(self, digest: str) -> Future:
+        # Concurrent requests for the same image share one render
+        future = self.in_flight.get(digest)
+        if future is None:
+            if self.executor is None:
+                self.executor = self._start_executor()
+            try:
+                future = self.executor.submit(render_variants, str(self.cache_dir), digest)
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM-killed on a huge image) and the pool refuses all work
+                logger.warning("Image worker pool is broken, starting a new one")
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = self._start_executor()
+                future = self.executor.submit(render_variants, str(self.cache_dir), digest)
+            future.add_done_callback(lambda _: self.in_flight.pop(digest, None))
+            self.in_flight[digest] = future
+        return future
+
+    async def render(self, digest: str) -> List[Tuple[int, str, int]]:
+        return await asyncio.shield(asyncio.wrap_future(self.submit(digest)))
+
+    def shutdown(self):
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def image_srcset(url: str) -> str:
+    """srcset for an image URL: local uploads and Unsplash are resized, others pass through."""
+    match = LOCAL_IMAGE_URL.match(url)
+    if match:
+        return ", ".join(f"{variant_url(match['digest'], w)} {w}w" for w in VARIANT_WIDTHS)
+
+    parts = urlsplit(url)
+    if parts.netloc == UNSPLASH_HOST:
+        query = dict(parse_qsl(parts.query))
+        query["auto"] = "format"
+        candidates = []
+        for width in VARIANT_WIDTHS:
+            query["w"] = str(width)
+            candidates.append(f"{urlunsplit(parts._replace(query=urlencode(query)))} {width}w")
+        return ", ".join(candidates)
+    return ""
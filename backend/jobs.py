@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from coordination import worker_id
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[dict], Awaitable[None]]
+
+
+class JobQueue:
+    """Durable background jobs stored in a Mongo collection.
+
+    ``enqueue`` is idempotent per ``dedupe_key``. Workers claim jobs with an
+    atomic find-and-modify and hold a renewable lease, so a job whose worker
+    died is picked up again once the lease lapses. Failed jobs are retried
+    with exponential backoff up to ``max_attempts``; handlers must therefore
+    be safe to run more than once.
+    """
+
+    def __init__(self, db, collection: str = "jobs", poll_interval: float = 1.0,
+                 lease_seconds: float = 60, max_attempts: int = 5, retry_delay: float = 2.0,
+                 retention_days: float = 7):
+        self.db = db
+        self.collection_name = collection
+        self.poll_interval = poll_interval
+        self.lease = timedelta(seconds=lease_seconds)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.retention = timedelta(days=retention_days)
+        self.owner = worker_id()
+        self.handlers: Dict[str, JobHandler] = {}
+        self.wakeup = asyncio.Event()
+        self.completed = 0
+        self.retried = 0
+        self.exhausted = 0
+
+    @property
+    def collection(self):
+        return self.db[self.collection_name]
+
+    def register(self, kind: str, handler: JobHandler):
+        self.handlers[kind] = handler
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("status", 1), ("run_at", 1)])
+        # Finished jobs are kept for a while so enqueue stays idempotent across retries
+        await self.collection.create_index("finished_at", expireAfterSeconds=int(self.retention.total_seconds()))
+
+    async def enqueue(self, kind: str, payload: Dict[str, Any], dedupe_key: Optional[str] = None) -> str:
+        from pymongo.errors import DuplicateKeyError
+
+        job_id = dedupe_key or str(uuid.uuid4())
+        now = datetime.now(timezone.utc)
+        try:
+            await self.collection.insert_one({
+                "_id": job_id,
+                "kind": kind,
+                "payload": payload,
+                "status": "queued",
+                "attempts": 0,
+                "run_at": now,
+                "created_at": now,
+            })
+        except DuplicateKeyError:
+            logger.info("Job %s already enqueued", job_id)
+        self.wakeup.set()
+        return job_id
+
+    async def claim(self) -> Optional[dict]:
+        from pymongo import ReturnDocument
+
+        now = datetime.now(timezone.utc)
+        return await self.collection.find_one_and_update(
+            {"$or": [
+                {"status": "queued", "run_at": {"$lte": now}},
+                {"status": "running", "lease_expires_at": {"$lt": now}},
+            ], "kind": {"$in": list(self.handlers)}},
+            {"$set": {"status": "running", "owner": self.owner, "lease_expires_at": now + self.lease},
+             "$inc": {"attempts": 1}},
+            sort=[("run_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def execute(self, job: dict):
+        renewal = asyncio.create_task(self._renew_lease(job["_id"]))
+        try:
+            await self.handlers[job["kind"]](job["payload"])
+        except asyncio.CancelledError:
+            # Let the lease lapse so another worker picks the job up
+            raise
+        except Exception as error:
+            logger.exception("Job %s (%s) failed on attempt %d", job["_id"], job["kind"], job["attempts"])
+            await self._record_failure(job, error)
+        else:
+            self.completed += 1
+            await self.collection.update_one(
+                {"_id": job["_id"], "owner": self.owner},
+                {"$set": {"status": "done", "finished_at": datetime.now(timezone.utc)},
+                 "$unset": {"lease_expires_at": "", "error": ""}},
+            )
+        finally:
+            renewal.cancel()
+
+    async def _record_failure(self, job: dict, error: Exception):
+        now = datetime.now(timezone.utc)
+        if job["attempts"] >= self.max_attempts:
+            self.exhausted += 1
+            update = {"status": "failed", "finished_at": now}
+        else:
+            self.retried += 1
+            delay = self.retry_delay * 2 ** (job["attempts"] - 1)
+            update = {"status": "queued", "run_at": now + timedelta(seconds=delay)}
+        await self.collection.update_one(
+            {"_id": job["_id"], "owner": self.owner},
+            {"$set": {**update, "error": repr(error)}, "$unset": {"lease_expires_at": ""}},
+        )
+
+    async def _renew_lease(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.lease.total_seconds() / 3)
+            await self.collection.update_one(
+                {"_id": job_id, "owner": self.owner},
+                {"$set": {"lease_expires_at": datetime.now(timezone.utc) + self.lease}},
+            )
+
+    async def run_pending(self) -> int:
+        """Run claimable jobs until none are left; returns how many ran."""
+        ran = 0
+        while True:
+            job = await self.claim()
+            if job is None:
+                return ran
+            await self.execute(job)
+            ran += 1
+
+    async def run(self):
+        from pymongo.errors import PyMongoError
+
+        while True:
+            self.wakeup.clear()
+            try:
+                await self.run_pending()
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError:
+                logger.exception("Job queue poll failed")
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def metrics(self) -> dict:
+        counts = {
+            row["_id"]: row["count"]
+            async for row in self.collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}])
+        }
+        return {
+            "queued": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "completed": self.completed,
+            "retried": self.retried,
+            "exhausted": self.exhausted,
+        }
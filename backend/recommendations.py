@@ -0,0 +1,155 @@
+import asyncio
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Pair codes pack (row, col) item indices into one int64 so the sparse
+# co-occurrence matrix can be held as two flat arrays: codes and counts.
+PAIR_SHIFT = np.int64(32)
+MAX_BASKET_SIZE = 50
+REFRESH_OVERLAP = timedelta(seconds=5)
+
+
+def basket_pair_codes(items: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Encode every ordered (a, b), a != b pair within each basket.
+
+    ``items`` is the concatenation of all baskets and ``lengths`` holds the
+    size of each basket, in order.
+    """
+    if items.size == 0:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.cumsum(lengths) - lengths
+    owners = np.repeat(np.arange(lengths.size), lengths)
+    group = lengths[owners]
+    group_starts = np.cumsum(group) - group
+    within = np.arange(group.sum()) - np.repeat(group_starts, group)
+    left = np.repeat(items, group)
+    right = items[np.repeat(offsets[owners], group) + within]
+    keep = left != right
+    return (left[keep].astype(np.int64) << PAIR_SHIFT) | right[keep].astype(np.int64)
+
+
+def merge_pair_counts(codes: np.ndarray, counts: np.ndarray, delta_codes: np.ndarray, delta_counts: np.ndarray):
+    merged, inverse = np.unique(np.concatenate([codes, delta_codes]), return_inverse=True)
+    totals = np.bincount(inverse, weights=np.concatenate([counts, delta_counts])).astype(np.int64)
+    keep = totals > 0
+    return merged[keep], totals[keep]
+
+
+def top_k_neighbours(codes: np.ndarray, counts: np.ndarray, popularity: np.ndarray, k: int) -> Dict[int, np.ndarray]:
+    if codes.size == 0:
+        return {}
+    rows = (codes >> PAIR_SHIFT).astype(np.int64)
+    cols = (codes & np.int64(0xFFFFFFFF)).astype(np.int64)
+    # Cosine-normalised so best-sellers don't dominate every neighbour list
+    scores = counts / np.sqrt(popularity[rows] * popularity[cols])
+    order = np.lexsort((cols, -scores, rows))
+    rows, cols = rows[order], cols[order]
+    row_starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+    rank = np.arange(rows.size) - np.repeat(row_starts, np.diff(np.r_[row_starts, rows.size]))
+    keep = rank < k
+    rows, cols = rows[keep], cols[keep]
+    splits = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+    return {int(row): group for row, group in zip(rows[splits], np.split(cols, splits[1:]))}
+
+
+class CooccurrenceRecommender:
+    def __init__(self, top_k: int = 8):
+        self.top_k = top_k
+        self.product_index: Dict[str, int] = {}
+        self.product_ids: List[str] = []
+        self.baskets: Dict[str, np.ndarray] = {}
+        self.codes = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.popularity = np.zeros(0, dtype=np.int64)
+        self.neighbours: Dict[str, List[str]] = {}
+        self.refreshed_at: Optional[datetime] = None
+
+    def related(self, product_id: str, limit: Optional[int] = None) -> List[str]:
+        return self.neighbours.get(product_id, [])[:limit or self.top_k]
+
+    def _encode_basket(self, product_ids: Iterable[str]) -> np.ndarray:
+        indices = set()
+        for product_id in product_ids:
+            if product_id not in self.product_index:
+                self.product_index[product_id] = len(self.product_ids)
+                self.product_ids.append(product_id)
+            indices.add(self.product_index[product_id])
+        return np.array(sorted(indices)[:MAX_BASKET_SIZE], dtype=np.int64)
+
+    def _basket_delta(self, baskets: List[np.ndarray]):
+        if not baskets:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        lengths = np.array([b.size for b in baskets], dtype=np.int64)
+        return np.concatenate(baskets), lengths
+
+    def apply_baskets(self, updated: Dict[str, Iterable[str]]):
+        """Replace the baskets of the given users and update the matrix in place."""
+        old = [self.baskets[user_id] for user_id in updated if user_id in self.baskets]
+        new = {user_id: self._encode_basket(product_ids) for user_id, product_ids in updated.items()}
+
+        old_items, old_lengths = self._basket_delta(old)
+        new_items, new_lengths = self._basket_delta(list(new.values()))
+        removed = basket_pair_codes(old_items, old_lengths)
+        added = basket_pair_codes(new_items, new_lengths)
+        self.codes, self.counts = merge_pair_counts(
+            self.codes,
+            self.counts,
+            np.concatenate([removed, added]),
+            np.concatenate([-np.ones(removed.size, dtype=np.int64), np.ones(added.size, dtype=np.int64)])
+        )
+
+        popularity = np.zeros(len(self.product_ids), dtype=np.int64)
+        popularity[:self.popularity.size] = self.popularity
+        np.subtract.at(popularity, old_items, 1)
+        np.add.at(popularity, new_items, 1)
+        self.popularity = popularity
+
+        for user_id, basket in new.items():
+            if basket.size:
+                self.baskets[user_id] = basket
+            else:
+                self.baskets.pop(user_id, None)
+
+        self.neighbours = {
+            self.product_ids[row]: [self.product_ids[col] for col in cols]
+            for row, cols in top_k_neighbours(self.codes, self.counts, self.popularity, self.top_k).items()
+        }
+
+    async def load_baskets(self, db, since: Optional[datetime] = None) -> Dict[str, List[str]]:
+        query = {"updated_at": {"$gte": since}} if since else {}
+        user_ids = set(await db.carts.distinct("user_id", query))
+        user_ids.update(await db.wishlists.distinct("user_id", query))
+        if not user_ids:
+            return {}
+
+        member_query = {"user_id": {"$in": list(user_ids)}} if since else {}
+        baskets: Dict[str, List[str]] = {user_id: [] for user_id in user_ids}
+        async for cart in db.carts.find(member_query, {"_id": 0, "user_id": 1, "items.product_id": 1}):
+            baskets.setdefault(cart["user_id"], []).extend(i["product_id"] for i in cart.get("items", []))
+        async for wishlist in db.wishlists.find(member_query, {"_id": 0, "user_id": 1, "product_ids": 1}):
+            baskets.setdefault(wishlist["user_id"], []).extend(wishlist.get("product_ids", []))
+        return baskets
+
+    async def refresh(self, db):
+        started_at = datetime.now(timezone.utc)
+        since = self.refreshed_at - REFRESH_OVERLAP if self.refreshed_at else None
+        baskets = await self.load_baskets(db, since)
+        if baskets:
+            await asyncio.to_thread(self.apply_baskets, baskets)
+        self.refreshed_at = started_at
+        return len(baskets)
+
+    async def run(self, db, interval: float):
+        while True:
+            try:
+                updated = await self.refresh(db)
+                if updated:
+                    logger.info("Recommendations refreshed for %d baskets", updated)
+            except Exception:
+                logger.exception("Recommendation refresh failed")
+            await asyncio.sleep(interval)
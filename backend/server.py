@@ -1,35 +1,134 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, File, Query, Request, UploadFile, status
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import re
+import io
+import json
+import base64
+import asyncio
 import logging
+import importlib
+from functools import lru_cache
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional
+from urllib.parse import parse_qs
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, computed_field, model_validator
+from typing import List, Optional, Literal
 import uuid
 from datetime import datetime, timezone, timedelta
-from passlib.context import CryptContext
-from jose import JWTError, jwt
+from database import LazyDatabase
+from concurrency import ConcurrencyLimitMiddleware, parse_limits
+from compression import CompressionMiddleware, CompressionStats
+from coordination import run_with_lease
+from jobs import JobQueue
+from caching import EntityCache, InvalidationBus
+from fieldsets import FieldSelection, FieldSpec, model_fields
+from images import (
+    ImagePipeline, image_srcset, variant_url,
+    VARIANT_WIDTHS, MAX_UPLOAD_BYTES, IMMUTABLE_CACHE_CONTROL, variant_formats
+)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Motor, passlib, jose, Pillow and numpy are imported on first use rather than
+# here, so importing this module (tests, tooling, a cold worker) stays cheap
+db = LazyDatabase()
 
-app = FastAPI()
 api_router = APIRouter(prefix="/api")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 SECRET_KEY = os.environ.get('SECRET_KEY', 'luxury-fashion-secret-key-2024')
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 43200
 
+ADMIN_EVENT_QUEUE_SIZE = int(os.environ.get('ADMIN_EVENT_QUEUE_SIZE', '100'))
+SSE_KEEPALIVE_SECONDS = 15
+# EventSource can only authenticate through the URL, so it gets its own short-lived token
+ADMIN_STREAM_TOKEN_SECONDS = 60
+MAX_BATCH_OPERATIONS = 100
+GUEST_CART_EXPIRE_DAYS = 30
+MAX_GUEST_CART_ITEMS = 50
+MAX_GUEST_CART_TOKEN_BYTES = 4096
+RECOMMENDATIONS_TOP_K = int(os.environ.get('RECOMMENDATIONS_TOP_K', '8'))
+RECOMMENDATIONS_REFRESH_SECONDS = float(os.environ.get('RECOMMENDATIONS_REFRESH_SECONDS', '300'))
+# Bump when ensure_indexes or the seed data change so the startup leader reruns them
+SCHEMA_VERSION = 5
+SEED_NAMESPACE = uuid.UUID('6f1c7a52-3b0e-4d8a-9d1e-5c2f0b7e4a91')
+CATALOG_CACHE_TTL_SECONDS = float(os.environ.get('CATALOG_CACHE_TTL_SECONDS', '300'))
+USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', '60'))
+IMAGE_CACHE_DIR = Path(os.environ.get('IMAGE_CACHE_DIR', ROOT_DIR / 'image_cache'))
+IMAGE_WORKERS = int(os.environ['IMAGE_WORKERS']) if os.environ.get('IMAGE_WORKERS') else None
+IMAGE_DIGEST = re.compile(r'^[0-9a-f]{64}$')
+IMAGE_VARIANT_NAME = re.compile(r'^(?P<width>\d+)\.(?P<fmt>[a-z]+)$')
+MAX_PRODUCTS_PER_PAGE = 1000
+ENQUIRY_PAGE_SIZE = 50
+MAX_ENQUIRY_PAGE_SIZE = 200
+MAX_ENQUIRY_TRANSITION_IDS = 500
+JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', '1'))
+COMPRESSION_MINIMUM_SIZE = int(os.environ.get('COMPRESSION_MINIMUM_SIZE', '1024'))
+CATALOG_PATH = re.compile(r'^/api/(products|collections)(/[^/]+)?$')
+# group=max_concurrent:max_queue:queue_timeout_seconds
+ROUTE_CONCURRENCY_LIMITS = os.environ.get(
+    'ROUTE_CONCURRENCY_LIMITS',
+    'auth=8:32:1.0,admin=4:16:2.0,search=16:64:0.5'
+)
+
+class AdminEventBroker:
+    def __init__(self, queue_size: int = ADMIN_EVENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.subscribers: set = set()
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+    def publish(self, event: str, data: dict):
+        for queue in self.subscribers:
+            if queue.full():
+                # A subscriber that can't keep up loses its backlog and is told to refetch
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(("resync", {}))
+            else:
+                queue.put_nowait((event, data))
+
+    def publish_stats(self, **delta: int):
+        self.publish("stats", delta)
+
+admin_events = AdminEventBroker()
+# Created by run_recommender once numpy has been imported in the background
+recommender = None
+route_limits = parse_limits(ROUTE_CONCURRENCY_LIMITS)
+catalog_cache = EntityCache(ttl=CATALOG_CACHE_TTL_SECONDS)
+user_cache = EntityCache(ttl=USER_CACHE_TTL_SECONDS)
+invalidation_bus = InvalidationBus(db)
+image_pipeline = ImagePipeline(IMAGE_CACHE_DIR, workers=IMAGE_WORKERS)
+compression_stats = CompressionStats()
+job_queue = JobQueue(db, poll_interval=JOB_POLL_SECONDS)
+
+def apply_invalidation(entity: str, entity_id: Optional[str]):
+    if entity == "user":
+        user_cache.invalidate("user", entity_id)
+    elif entity in ("product", "collection"):
+        catalog_cache.invalidate(entity, entity_id)
+        catalog_cache.invalidate(f"{entity}s")
+
+def flush_caches():
+    catalog_cache.clear()
+    user_cache.clear()
+
+invalidation_bus.subscribe(apply_invalidation, on_flush=flush_caches)
+background_tasks: List[asyncio.Task] = []
+
 class User(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -45,10 +144,12 @@ class UserCreate(BaseModel):
     password: str
     name: str
     phone: Optional[str] = None
+    guest_cart: Optional[str] = None
 
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
+    guest_cart: Optional[str] = None
 
 class Token(BaseModel):
     access_token: str
@@ -67,6 +168,11 @@ class Product(BaseModel):
     availability: bool = True
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+    @computed_field
+    @property
+    def image_srcset(self) -> List[str]:
+        return [image_srcset(url) for url in self.images]
+
 class ProductCreate(BaseModel):
     name: str
     description: str
@@ -76,6 +182,17 @@ class ProductCreate(BaseModel):
     images: List[str]
     availability: bool = True
 
+ProductSort = Literal["price_asc", "price_desc", "newest", "name"]
+# id breaks ties so pages are stable; each sort is backed by a compound index in ensure_indexes
+PRODUCT_SORTS = {
+    "price_asc": [("price", 1), ("id", 1)],
+    "price_desc": [("price", -1), ("id", -1)],
+    "newest": [("created_at", -1), ("id", -1)],
+    "name": [("name", 1), ("id", 1)],
+}
+# Descending sorts scan the ascending index backwards
+PRODUCT_SORT_INDEXES = {sort: [(field, 1) for field, _ in keys] for sort, keys in PRODUCT_SORTS.items()}
+
 class Collection(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -85,6 +202,16 @@ class Collection(BaseModel):
     product_ids: List[str] = []
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
 
+    @computed_field
+    @property
+    def image_srcset(self) -> str:
+        return image_srcset(self.image)
+
+class ImageUpload(BaseModel):
+    digest: str
+    url: str
+    srcset: str
+
 class CollectionCreate(BaseModel):
     name: str
     description: str
@@ -97,13 +224,34 @@ class WishlistItem(BaseModel):
 class CartItem(BaseModel):
     product_id: str
     size: str
-    quantity: int = 1
+    quantity: int = Field(default=1, ge=1)
 
 class CartUpdate(BaseModel):
     product_id: str
     size: str
     quantity: int
 
+class CartOperation(BaseModel):
+    target: Literal["cart", "wishlist"]
+    action: Literal["add", "update", "remove"]
+    product_id: str
+    size: Optional[str] = None
+    # Updating a line to 0 removes it; adds must be positive
+    quantity: int = Field(default=1, ge=0)
+
+    @model_validator(mode="after")
+    def check_quantity(self):
+        if self.action == "add" and self.quantity < 1:
+            raise ValueError("quantity must be at least 1 when adding")
+        return self
+
+class CartBatch(BaseModel):
+    operations: List[CartOperation] = Field(max_length=MAX_BATCH_OPERATIONS)
+
+class GuestCartBatch(BaseModel):
+    token: Optional[str] = None
+    operations: List[CartOperation] = Field(default=[], max_length=MAX_BATCH_OPERATIONS)
+
 class Enquiry(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -119,53 +267,248 @@ class EnquiryCreate(BaseModel):
     product_id: Optional[str] = None
     message: str
 
+EnquiryStatus = Literal["pending", "in_progress", "resolved", "closed"]
+# Allowed status changes, from -> to
+ENQUIRY_TRANSITIONS = {
+    "pending": ("in_progress", "resolved", "closed"),
+    "in_progress": ("pending", "resolved", "closed"),
+    "resolved": ("in_progress", "closed"),
+    "closed": ("pending",),
+}
+
+# Newest first; id breaks ties so keyset pages never skip or repeat
+ENQUIRY_ORDER = [("created_at", -1), ("id", -1)]
+ENQUIRY_ORDER_INDEX = [("created_at", 1), ("id", 1)]
+
+class EnquiryTransition(BaseModel):
+    ids: List[str] = Field(min_length=1, max_length=MAX_ENQUIRY_TRANSITION_IDS)
+    status: EnquiryStatus
+
+# Allow-lists for ?fields= on listing endpoints; cover_* project only the first image
+PRODUCT_FIELDS = FieldSelection("product", {
+    **model_fields(Product),
+    "image_srcset": FieldSpec(List[str], {"images": 1}, lambda p: [image_srcset(url) for url in p.get("images") or []]),
+    "cover_image": FieldSpec(str, {"images": {"$slice": 1}}, lambda p: (p.get("images") or [None])[0]),
+    "cover_srcset": FieldSpec(str, {"images": {"$slice": 1}}, lambda p: image_srcset(p["images"][0]) if p.get("images") else None),
+})
+USER_FIELDS = FieldSelection("user", model_fields(User))
+ENQUIRY_FIELDS = FieldSelection("enquiry", model_fields(Enquiry))
+
+@lru_cache(maxsize=None)
+def password_context():
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_context().verify(plain_password, hashed_password)
+
+def apply_cart_operations(items: List[dict], wishlist: List[str], operations: List[CartOperation]):
+    """Apply operations to an in-memory cart; used for signed guest carts."""
+    items = [dict(i) for i in items]
+    wishlist = list(wishlist)
+
+    for op in operations:
+        if op.target == "wishlist":
+            if op.action == "add" and op.product_id not in wishlist:
+                wishlist.append(op.product_id)
+            elif op.action == "remove" and op.product_id in wishlist:
+                wishlist.remove(op.product_id)
+            elif op.action == "update":
+                raise HTTPException(status_code=400, detail="Wishlist items cannot be updated")
+            continue
+
+        if op.size is None:
+            raise HTTPException(status_code=400, detail="Cart operations require a size")
+        existing_item = next((i for i in items if i["product_id"] == op.product_id and i["size"] == op.size), None)
+        if op.action == "add":
+            if existing_item:
+                existing_item["quantity"] += op.quantity
+            else:
+                items.append(CartItem(product_id=op.product_id, size=op.size, quantity=op.quantity).model_dump())
+        elif op.action == "update" and op.quantity > 0:
+            if existing_item:
+                existing_item["quantity"] = op.quantity
+        elif existing_item:
+            items.remove(existing_item)
+
+    return items, wishlist
+
+def route_group(scope: dict) -> Optional[str]:
+    path = scope["path"]
+    if path in ("/api/auth/login", "/api/auth/register"):
+        return "auth"
+    if path.startswith("/api/admin/") and path != "/api/admin/events" and not path.startswith("/api/admin/metrics/"):
+        return "admin"
+    if path == "/api/products" and parse_qs(scope.get("query_string", b"").decode("latin-1")).get("search"):
+        return "search"
+    return None
+
+def is_catalog_response(scope: dict) -> bool:
+    # Bodies that are identical for every user and change only with the catalog version
+    return bool(CATALOG_PATH.match(scope["path"]))
+
+def create_access_token(data: dict, expires_delta: timedelta = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)):
+    from jose import jwt
 
-def create_access_token(data: dict):
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    expire = datetime.now(timezone.utc) + expires_delta
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    token = credentials.credentials
+def encode_guest_cart(items: List[dict], wishlist: List[str]) -> str:
+    if len(items) + len(wishlist) > MAX_GUEST_CART_ITEMS:
+        raise HTTPException(status_code=400, detail="Guest cart is full")
+    from jose import jwt
+
+    token = jwt.encode({
+        "typ": "guest_cart",
+        "c": [[i["product_id"], i["size"], i["quantity"]] for i in items],
+        "w": wishlist,
+        "exp": datetime.now(timezone.utc) + timedelta(days=GUEST_CART_EXPIRE_DAYS)
+    }, SECRET_KEY, algorithm=ALGORITHM)
+    if len(token) > MAX_GUEST_CART_TOKEN_BYTES:
+        raise HTTPException(status_code=400, detail="Guest cart is full")
+    return token
+
+def decode_guest_cart(token: Optional[str]):
+    from jose import JWTError, jwt
+
+    if not token:
+        return [], []
+    if len(token) > MAX_GUEST_CART_TOKEN_BYTES:
+        raise HTTPException(status_code=400, detail="Invalid guest cart")
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        if payload.get("typ") != "guest_cart":
+            raise HTTPException(status_code=400, detail="Invalid guest cart")
+        items = [
+            CartItem(product_id=product_id, size=size, quantity=quantity).model_dump()
+            for product_id, size, quantity in payload.get("c", [])
+        ]
+        wishlist = [str(product_id) for product_id in payload.get("w", [])]
+    except (JWTError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid guest cart")
+    return items, wishlist
+
+async def merge_guest_cart(user_id: str, token: Optional[str]):
+    try:
+        items, wishlist = decode_guest_cart(token)
+    except HTTPException:
+        logging.warning("Ignoring invalid guest cart on login for user %s", user_id)
+        return
+
+    if items:
+        same_line = {"$and": [
+            {"$eq": ["$$i.product_id", "$$this.product_id"]},
+            {"$eq": ["$$i.size", "$$this.size"]}
+        ]}
+        # Single pipeline update: fold the guest lines into the stored ones, summing quantities
+        await db.carts.update_one({"user_id": user_id}, [{"$set": {"items": {"$reduce": {
+            # $literal: guest values must never be read as field paths or variables
+            "input": {"$concatArrays": [{"$ifNull": ["$items", []]}, {"$literal": items}]},
+            "initialValue": [],
+            "in": {"$cond": [
+                {"$anyElementTrue": [{"$map": {"input": "$$value", "as": "i", "in": same_line}}]},
+                {"$map": {"input": "$$value", "as": "i", "in": {"$cond": [
+                    same_line,
+                    {"$mergeObjects": ["$$i", {"quantity": {"$add": ["$$i.quantity", "$$this.quantity"]}}]},
+                    "$$i"
+                ]}}},
+                {"$concatArrays": ["$$value", ["$$this"]]}
+            ]}
+        }}, "updated_at": "$$NOW"}}], upsert=True)
+    if wishlist:
+        await db.wishlists.update_one(
+            {"user_id": user_id},
+            {"$addToSet": {"product_ids": {"$each": wishlist}}, "$currentDate": {"updated_at": True}},
+            upsert=True
+        )
+
+async def cascade_product_deletion(payload: dict):
+    # $pull is idempotent, so a retried job just finds nothing left to remove.
+    # Touching updated_at lets the recommender drop the products on its next refresh.
+    product_ids = payload["product_ids"]
+    await db.carts.update_many(
+        {"items.product_id": {"$in": product_ids}},
+        {"$pull": {"items": {"product_id": {"$in": product_ids}}}, "$currentDate": {"updated_at": True}}
+    )
+    await db.wishlists.update_many(
+        {"product_ids": {"$in": product_ids}},
+        {"$pull": {"product_ids": {"$in": product_ids}}, "$currentDate": {"updated_at": True}}
+    )
+    collection_ids = await db.collections.distinct("id", {"product_ids": {"$in": product_ids}})
+    if collection_ids:
+        await db.collections.update_many(
+            {"id": {"$in": collection_ids}},
+            {"$pull": {"product_ids": {"$in": product_ids}}}
+        )
+        for collection_id in collection_ids:
+            await invalidation_bus.publish("collection", collection_id)
+
+job_queue.register("cascade_product_deletion", cascade_product_deletion)
+
+async def get_user_from_token(token: str, token_type: Optional[str] = None) -> User:
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
-        if email is None:
+        # Access tokens carry no typ; scoped tokens are only accepted where they were issued for
+        if email is None or payload.get("typ") != token_type:
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     
-    user = await db.users.find_one({"email": email}, {"_id": 0, "password": 0})
+    user = user_cache.get("user", email)
     if user is None:
-        raise HTTPException(status_code=401, detail="User not found")
-    return User(**user)
+        version = user_cache.version
+        user = await db.users.find_one({"email": email}, {"_id": 0, "password": 0})
+        if user is None:
+            raise HTTPException(status_code=401, detail="User not found")
+        user = User(**user)
+        user_cache.set("user", email, user, version=version)
+    return user
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return await get_user_from_token(credentials.credentials)
 
 async def get_admin_user(current_user: User = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     return current_user
 
+async def get_admin_stream_user(
+    token: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+):
+    # EventSource cannot send headers, so the stream also accepts a stream-scoped ?token=
+    if credentials:
+        return await get_admin_user(await get_user_from_token(credentials.credentials))
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return await get_admin_user(await get_user_from_token(token, token_type="admin_stream"))
+
 @api_router.post("/auth/register", response_model=Token)
 async def register(user_data: UserCreate):
     existing_user = await db.users.find_one({"email": user_data.email})
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    user_dict = user_data.model_dump()
-    hashed_password = hash_password(user_dict.pop("password"))
+    user_dict = user_data.model_dump(exclude={"guest_cart"})
+    hashed_password = await asyncio.to_thread(hash_password, user_dict.pop("password"))
     
     user = User(**user_dict)
     user_doc = user.model_dump()
     user_doc["password"] = hashed_password
     
     await db.users.insert_one(user_doc)
+    admin_events.publish_stats(total_users=1)
+    await merge_guest_cart(user.id, user_data.guest_cart)
     
     access_token = create_access_token(data={"sub": user.email})
     return Token(access_token=access_token, token_type="bearer", user=user)
@@ -173,18 +516,20 @@ async def register(user_data: UserCreate):
 @api_router.post("/auth/login", response_model=Token)
 async def login(credentials: UserLogin):
     user = await db.users.find_one({"email": credentials.email})
-    if not user or not verify_password(credentials.password, user["password"]):
+    if not user or not await asyncio.to_thread(verify_password, credentials.password, user["password"]):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
     await db.users.update_one(
         {"email": credentials.email},
         {"$inc": {"login_count": 1}}
     )
+    await invalidation_bus.publish("user", credentials.email)
     
     user.pop("_id", None)
     user.pop("password", None)
     user_obj = User(**user)
     user_obj.login_count += 1
+    await merge_guest_cart(user_obj.id, credentials.guest_cart)
     
     access_token = create_access_token(data={"sub": user_obj.email})
     return Token(access_token=access_token, token_type="bearer", user=user_obj)
@@ -193,15 +538,14 @@ async def login(credentials: UserLogin):
 async def get_me(current_user: User = Depends(get_current_user)):
     return current_user
 
-@api_router.get("/products", response_model=List[Product])
-async def get_products(
+def product_query(
     search: Optional[str] = None,
     category: Optional[str] = None,
     size: Optional[str] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     availability: Optional[bool] = None
-):
+) -> dict:
     query = {}
     if search:
         query["name"] = {"$regex": search, "$options": "i"}
@@ -217,21 +561,79 @@ async def get_products(
             query["price"]["$lte"] = max_price
     if availability is not None:
         query["availability"] = availability
-    
-    products = await db.products.find(query, {"_id": 0}).to_list(1000)
-    return [Product(**p) for p in products]
+    return query
+
+def find_products(query: dict, projection: dict, sort: Optional[str], limit: int):
+    cursor = db.products.find(query, projection)
+    if sort:
+        # Pin the sort-aligned index: the planner would otherwise pick a range
+        # index on price or name and sort the matches in memory
+        index = PRODUCT_SORT_INDEXES[sort]
+        cursor = cursor.sort(PRODUCT_SORTS[sort]).hint([("category", 1)] + index if "category" in query else index)
+    return cursor.limit(limit)
+
+@api_router.get("/products", response_model=List[Product])
+async def get_products(
+    search: Optional[str] = None,
+    category: Optional[str] = None,
+    size: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    availability: Optional[bool] = None,
+    sort: Optional[ProductSort] = None,
+    limit: int = Query(MAX_PRODUCTS_PER_PAGE, ge=1, le=MAX_PRODUCTS_PER_PAGE),
+    fields: Optional[str] = None
+):
+    requested = PRODUCT_FIELDS.parse(fields)
+    query = product_query(search, category, size, min_price, max_price, availability)
+
+    cache_key = json.dumps([query, sort, limit, requested], sort_keys=True)
+    products = catalog_cache.get("products", cache_key)
+    if products is None:
+        version = catalog_cache.version
+        projection = PRODUCT_FIELDS.projection(requested) if requested else {"_id": 0}
+        docs = await find_products(query, projection, sort, limit).to_list(limit)
+        products = PRODUCT_FIELDS.trim(requested, docs) if requested else [Product(**p) for p in docs]
+        catalog_cache.set("products", cache_key, products, version=version)
+    if requested:
+        return PRODUCT_FIELDS.response(requested, products)
+    return products
 
 @api_router.get("/products/{product_id}", response_model=Product)
 async def get_product(product_id: str):
-    product = await db.products.find_one({"id": product_id}, {"_id": 0})
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    return Product(**product)
+    product = catalog_cache.get("product", product_id)
+    if product is None:
+        version = catalog_cache.version
+        product = await db.products.find_one({"id": product_id}, {"_id": 0})
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+        product = Product(**product)
+        catalog_cache.set("product", product_id, product, version=version)
+    return product
+
+@api_router.get("/products/{product_id}/related", response_model=List[Product])
+async def get_related_products(product_id: str, limit: int = Query(4, ge=1, le=RECOMMENDATIONS_TOP_K)):
+    related_ids = recommender.related(product_id, limit) if recommender else []
+    products = await db.products.find({"id": {"$in": related_ids}}, {"_id": 0}).to_list(limit)
+    products.sort(key=lambda p: related_ids.index(p["id"]))
+
+    if len(products) < limit:
+        # Fall back to the same category until the co-occurrence data covers this product
+        product = await db.products.find_one({"id": product_id}, {"_id": 0, "category": 1})
+        if product:
+            exclude = [product_id] + [p["id"] for p in products]
+            products += await db.products.find(
+                {"category": product["category"], "id": {"$nin": exclude}},
+                {"_id": 0}
+            ).to_list(limit - len(products))
+    return [Product(**p) for p in products]
 
 @api_router.post("/products", response_model=Product)
 async def create_product(product_data: ProductCreate, admin: User = Depends(get_admin_user)):
     product = Product(**product_data.model_dump())
-    await db.products.insert_one(product.model_dump())
+    await db.products.insert_one(product.model_dump(exclude={"image_srcset"}))
+    await invalidation_bus.publish("product", product.id)
+    admin_events.publish_stats(total_products=1)
     return product
 
 @api_router.put("/products/{product_id}", response_model=Product)
@@ -242,35 +644,91 @@ async def update_product(product_id: str, product_data: ProductCreate, admin: Us
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
+    await invalidation_bus.publish("product", product_id)
     
     product = await db.products.find_one({"id": product_id}, {"_id": 0})
     return Product(**product)
 
 @api_router.delete("/products/{product_id}")
 async def delete_product(product_id: str, admin: User = Depends(get_admin_user)):
+    # Queue the cascade first: a crash after the delete must not leave dangling
+    # references, and the $pull cascade is harmless if the delete then fails
+    await job_queue.enqueue(
+        "cascade_product_deletion",
+        {"product_ids": [product_id]},
+        dedupe_key=f"cascade_product_deletion:{product_id}"
+    )
     result = await db.products.delete_one({"id": product_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
+    await invalidation_bus.publish("product", product_id)
+    admin_events.publish_stats(total_products=-1)
     return {"message": "Product deleted successfully"}
 
 @api_router.get("/collections", response_model=List[Collection])
 async def get_collections():
-    collections = await db.collections.find({}, {"_id": 0}).to_list(1000)
-    return [Collection(**c) for c in collections]
+    collections = catalog_cache.get("collections", "all")
+    if collections is None:
+        version = catalog_cache.version
+        collections = [Collection(**c) for c in await db.collections.find({}, {"_id": 0}).to_list(1000)]
+        catalog_cache.set("collections", "all", collections, version=version)
+    return collections
 
 @api_router.get("/collections/{collection_id}", response_model=Collection)
 async def get_collection(collection_id: str):
-    collection = await db.collections.find_one({"id": collection_id}, {"_id": 0})
-    if not collection:
-        raise HTTPException(status_code=404, detail="Collection not found")
-    return Collection(**collection)
+    collection = catalog_cache.get("collection", collection_id)
+    if collection is None:
+        version = catalog_cache.version
+        collection = await db.collections.find_one({"id": collection_id}, {"_id": 0})
+        if not collection:
+            raise HTTPException(status_code=404, detail="Collection not found")
+        collection = Collection(**collection)
+        catalog_cache.set("collection", collection_id, collection, version=version)
+    return collection
 
 @api_router.post("/collections", response_model=Collection)
 async def create_collection(collection_data: CollectionCreate, admin: User = Depends(get_admin_user)):
     collection = Collection(**collection_data.model_dump())
-    await db.collections.insert_one(collection.model_dump())
+    await db.collections.insert_one(collection.model_dump(exclude={"image_srcset"}))
+    await invalidation_bus.publish("collection", collection.id)
     return collection
 
+@api_router.post("/admin/images", response_model=ImageUpload)
+async def upload_image(file: UploadFile = File(...), admin: User = Depends(get_admin_user)):
+    data = await file.read(MAX_UPLOAD_BYTES + 1)
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Image is too large")
+    from PIL import Image as PILImage
+
+    try:
+        await asyncio.to_thread(lambda: PILImage.open(io.BytesIO(data)).verify())
+    except Exception:
+        raise HTTPException(status_code=400, detail="Unsupported image file")
+
+    digest = await asyncio.to_thread(image_pipeline.store_original, data)
+    def report_failure(future):
+        if not future.cancelled() and future.exception() is not None:
+            logging.error("Rendering variants of image %s failed", digest, exc_info=future.exception())
+
+    # Variants render in the worker pool; the URL is usable as soon as they land
+    image_pipeline.submit(digest).add_done_callback(report_failure)
+    url = variant_url(digest, VARIANT_WIDTHS[-1])
+    return ImageUpload(digest=digest, url=url, srcset=image_srcset(url))
+
+@api_router.get("/images/{digest}/{variant}")
+async def get_image_variant(digest: str, variant: str):
+    match = IMAGE_VARIANT_NAME.match(variant)
+    if (not IMAGE_DIGEST.match(digest) or not match
+            or int(match["width"]) not in VARIANT_WIDTHS or match["fmt"] not in variant_formats()):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    path = image_pipeline.variant(digest, int(match["width"]), match["fmt"])
+    if not path.exists():
+        if not image_pipeline.has_original(digest):
+            raise HTTPException(status_code=404, detail="Image not found")
+        await image_pipeline.render(digest)
+    return FileResponse(path, media_type=f"image/{match['fmt']}", headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL})
+
 @api_router.get("/wishlist", response_model=List[str])
 async def get_wishlist(current_user: User = Depends(get_current_user)):
     wishlist = await db.wishlists.find_one({"user_id": current_user.id}, {"_id": 0})
@@ -282,7 +740,7 @@ async def get_wishlist(current_user: User = Depends(get_current_user)):
 async def add_to_wishlist(item: WishlistItem, current_user: User = Depends(get_current_user)):
     await db.wishlists.update_one(
         {"user_id": current_user.id},
-        {"$addToSet": {"product_ids": item.product_id}},
+        {"$addToSet": {"product_ids": item.product_id}, "$currentDate": {"updated_at": True}},
         upsert=True
     )
     return {"message": "Added to wishlist"}
@@ -291,7 +749,7 @@ async def add_to_wishlist(item: WishlistItem, current_user: User = Depends(get_c
 async def remove_from_wishlist(product_id: str, current_user: User = Depends(get_current_user)):
     await db.wishlists.update_one(
         {"user_id": current_user.id},
-        {"$pull": {"product_ids": product_id}}
+        {"$pull": {"product_ids": product_id}, "$currentDate": {"updated_at": True}}
     )
     return {"message": "Removed from wishlist"}
 
@@ -314,17 +772,18 @@ async def add_to_cart(item: CartItem, current_user: User = Depends(get_current_u
             existing_item["quantity"] += item.quantity
             await db.carts.update_one(
                 {"user_id": current_user.id},
-                {"$set": {"items": items}}
+                {"$set": {"items": items}, "$currentDate": {"updated_at": True}}
             )
         else:
             await db.carts.update_one(
                 {"user_id": current_user.id},
-                {"$push": {"items": item.model_dump()}}
+                {"$push": {"items": item.model_dump()}, "$currentDate": {"updated_at": True}}
             )
     else:
         await db.carts.insert_one({
             "user_id": current_user.id,
-            "items": [item.model_dump()]
+            "items": [item.model_dump()],
+            "updated_at": datetime.now(timezone.utc)
         })
     
     return {"message": "Added to cart"}
@@ -343,7 +802,7 @@ async def update_cart(item: CartUpdate, current_user: User = Depends(get_current
     
     await db.carts.update_one(
         {"user_id": current_user.id},
-        {"$set": {"items": items}}
+        {"$set": {"items": items}, "$currentDate": {"updated_at": True}}
     )
     return {"message": "Cart updated"}
 
@@ -351,10 +810,109 @@ async def update_cart(item: CartUpdate, current_user: User = Depends(get_current
 async def remove_from_cart(product_id: str, size: str, current_user: User = Depends(get_current_user)):
     await db.carts.update_one(
         {"user_id": current_user.id},
-        {"$pull": {"items": {"product_id": product_id, "size": size}}}
+        {"$pull": {"items": {"product_id": product_id, "size": size}}, "$currentDate": {"updated_at": True}}
     )
     return {"message": "Removed from cart"}
 
+def cart_write(user_id: str, op: CartOperation) -> list:
+    """Atomic updates applying one cart operation, for an ordered bulk_write."""
+    from pymongo import UpdateOne
+
+    line = {"product_id": op.product_id, "size": op.size}
+    touch = {"$currentDate": {"updated_at": True}}
+    if op.action == "add":
+        # Create the line if it is missing, then increment it; concurrent adds of the
+        # same line can both miss it, but only one push matches the $not filter.
+        return [
+            UpdateOne({"user_id": user_id, "items": {"$not": {"$elemMatch": line}}},
+                      {"$push": {"items": {**line, "quantity": 0}}}),
+            UpdateOne({"user_id": user_id, "items": {"$elemMatch": line}},
+                      {"$inc": {"items.$.quantity": op.quantity}, **touch}),
+        ]
+    if op.action == "update" and op.quantity > 0:
+        return [UpdateOne({"user_id": user_id, "items": {"$elemMatch": line}},
+                          {"$set": {"items.$.quantity": op.quantity}, **touch})]
+    return [UpdateOne({"user_id": user_id}, {"$pull": {"items": line}, **touch})]
+
+def wishlist_write(user_id: str, op: CartOperation) -> list:
+    from pymongo import UpdateOne
+
+    if op.action == "update":
+        raise HTTPException(status_code=400, detail="Wishlist items cannot be updated")
+    update = {"$addToSet": {"product_ids": op.product_id}} if op.action == "add" else {"$pull": {"product_ids": op.product_id}}
+    return [UpdateOne({"user_id": user_id}, {**update, "$currentDate": {"updated_at": True}}, upsert=True)]
+
+async def validate_cart_operations(operations: List[CartOperation]):
+    """Reject adds of products that do not exist or sizes they do not come in."""
+    adds = [op for op in operations if op.action == "add"]
+    if not adds:
+        return
+    products = {
+        p["id"]: p.get("sizes", [])
+        async for p in db.products.find({"id": {"$in": list({op.product_id for op in adds})}},
+                                        {"_id": 0, "id": 1, "sizes": 1})
+    }
+    for op in adds:
+        if op.product_id not in products:
+            raise HTTPException(status_code=400, detail=f"Unknown product: {op.product_id}")
+        if op.target == "cart" and op.size is not None and op.size not in products[op.product_id]:
+            raise HTTPException(status_code=400, detail=f"Size {op.size} is not available for {op.product_id}")
+
+async def bulk_write_upserts(collection, writes: list):
+    """Ordered bulk_write whose upserts may race another request creating the same doc.
+
+    The unique user_id index turns the losing insert into a duplicate key error; the
+    writes before it were applied and the doc now exists, so resume from that write.
+    """
+    from pymongo.errors import BulkWriteError
+
+    try:
+        await collection.bulk_write(writes)
+    except BulkWriteError as error:
+        errors = error.details.get("writeErrors", [])
+        if not errors or errors[0].get("code") != 11000:
+            raise
+        await collection.bulk_write(writes[errors[0]["index"]:])
+
+@api_router.post("/cart/batch")
+async def apply_cart_batch(batch: CartBatch, current_user: User = Depends(get_current_user)):
+    from pymongo import UpdateOne
+
+    await validate_cart_operations(batch.operations)
+    cart_writes, wishlist_writes = [], []
+    for op in batch.operations:
+        if op.target == "wishlist":
+            wishlist_writes += wishlist_write(current_user.id, op)
+        elif op.size is None:
+            raise HTTPException(status_code=400, detail="Cart operations require a size")
+        else:
+            cart_writes += cart_write(current_user.id, op)
+
+    # Each operation is its own atomic update, so batches that overlap (a second tab, a
+    # flush racing the previous one) interleave instead of overwriting each other.
+    if cart_writes:
+        await bulk_write_upserts(
+            db.carts,
+            [UpdateOne({"user_id": current_user.id}, {"$setOnInsert": {"items": []}}, upsert=True)] + cart_writes
+        )
+    if wishlist_writes:
+        await bulk_write_upserts(db.wishlists, wishlist_writes)
+
+    cart = await db.carts.find_one({"user_id": current_user.id}, {"_id": 0, "items": 1}) or {}
+    wishlist = await db.wishlists.find_one({"user_id": current_user.id}, {"_id": 0, "product_ids": 1}) or {}
+    return {"cart": {"items": cart.get("items", [])}, "wishlist": wishlist.get("product_ids", [])}
+
+@api_router.post("/guest/cart")
+async def apply_guest_cart_batch(batch: GuestCartBatch):
+    items, wishlist = decode_guest_cart(batch.token)
+    await validate_cart_operations(batch.operations)
+    items, wishlist = apply_cart_operations(items, wishlist, batch.operations)
+    return {
+        "token": encode_guest_cart(items, wishlist),
+        "cart": {"items": items},
+        "wishlist": wishlist
+    }
+
 @api_router.post("/enquiry", response_model=Enquiry)
 async def create_enquiry(enquiry_data: EnquiryCreate, current_user: User = Depends(get_current_user)):
     enquiry = Enquiry(
@@ -364,6 +922,8 @@ async def create_enquiry(enquiry_data: EnquiryCreate, current_user: User = Depen
         **enquiry_data.model_dump()
     )
     await db.enquiries.insert_one(enquiry.model_dump())
+    admin_events.publish("enquiry", enquiry.model_dump())
+    admin_events.publish_stats(total_enquiries=1, pending_enquiries=1 if enquiry.status == "pending" else 0)
     return enquiry
 
 @api_router.get("/enquiry", response_model=List[Enquiry])
@@ -371,16 +931,179 @@ async def get_user_enquiries(current_user: User = Depends(get_current_user)):
     enquiries = await db.enquiries.find({"user_id": current_user.id}, {"_id": 0}).to_list(1000)
     return [Enquiry(**e) for e in enquiries]
 
+def utc_isoformat(value: datetime) -> str:
+    # Naive datetimes from query strings are taken as UTC
+    return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).astimezone(timezone.utc).isoformat()
+
+def encode_enquiry_cursor(enquiry: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps([enquiry["created_at"], enquiry["id"]]).encode()).decode()
+
+def decode_enquiry_cursor(cursor: str):
+    try:
+        created_at, enquiry_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Anything but strings would be read as query operators
+    if not isinstance(created_at, str) or not isinstance(enquiry_id, str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return created_at, enquiry_id
+
+def enquiry_query(
+    status: Optional[str] = None,
+    product_id: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    cursor: Optional[str] = None
+) -> dict:
+    # created_at is stored as a UTC ISO string, which sorts chronologically
+    query = {}
+    if status:
+        query["status"] = status
+    if product_id:
+        query["product_id"] = product_id
+    if created_after or created_before:
+        query["created_at"] = {}
+        if created_after:
+            query["created_at"]["$gte"] = utc_isoformat(created_after)
+        if created_before:
+            query["created_at"]["$lt"] = utc_isoformat(created_before)
+    if cursor:
+        # Keyset paging on (created_at, id), newest first; the $lte bound keeps the index scan tight
+        created_at, enquiry_id = decode_enquiry_cursor(cursor)
+        query.setdefault("created_at", {})["$lte"] = created_at
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": enquiry_id}},
+        ]
+    return query
+
+def find_enquiries(query: dict, projection: dict, limit: int):
+    # Pin the index whose equality prefix matches the filter, as for product sorts
+    prefix = [(field, 1) for field in ("status", "product_id") if field in query]
+    return db.enquiries.find(query, projection).sort(ENQUIRY_ORDER).hint(
+        prefix + ENQUIRY_ORDER_INDEX
+    ).limit(limit)
+
 @api_router.get("/admin/enquiries", response_model=List[Enquiry])
-async def get_all_enquiries(admin: User = Depends(get_admin_user)):
-    enquiries = await db.enquiries.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
+async def get_all_enquiries(
+    response: Response,
+    status: Optional[EnquiryStatus] = None,
+    product_id: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(ENQUIRY_PAGE_SIZE, ge=1, le=MAX_ENQUIRY_PAGE_SIZE),
+    fields: Optional[str] = None,
+    admin: User = Depends(get_admin_user)
+):
+    requested = ENQUIRY_FIELDS.parse(fields)
+    query = enquiry_query(status, product_id, created_after, created_before, cursor)
+    projection = {**ENQUIRY_FIELDS.projection(requested), "created_at": 1} if requested else {"_id": 0}
+    enquiries = await find_enquiries(query, projection, limit).to_list(limit)
+    # The next page link is a header so the body stays a plain list
+    headers = {"X-Next-Cursor": encode_enquiry_cursor(enquiries[-1])} if len(enquiries) == limit else {}
+    if requested:
+        page = ENQUIRY_FIELDS.response(requested, ENQUIRY_FIELDS.trim(requested, enquiries))
+        page.headers.update(headers)
+        return page
+    response.headers.update(headers)
     return [Enquiry(**e) for e in enquiries]
 
+async def transition_enquiries(ids: List[str], status: str):
+    """Move every listed enquiry whose current status allows it to ``status``.
+
+    Returns (updated, pending_delta). Enquiries leaving "pending" are moved by
+    their own update, so its modified count is exactly how many this call took
+    out of pending, whatever other transitions run alongside it.
+    """
+    sources = [source for source, targets in ENQUIRY_TRANSITIONS.items() if status in targets]
+    now = datetime.now(timezone.utc).isoformat()
+
+    async def move(from_statuses: List[str]) -> int:
+        if not from_statuses:
+            return 0
+        result = await db.enquiries.update_many(
+            {"id": {"$in": ids}, "status": {"$in": from_statuses}},
+            [{"$set": {"previous_status": "$status", "status": status, "status_updated_at": now}}]
+        )
+        return result.modified_count
+
+    left_pending = await move([source for source in sources if source == "pending"])
+    moved = await move([source for source in sources if source != "pending"])
+    updated = left_pending + moved
+    return updated, updated if status == "pending" else -left_pending
+
+@api_router.post("/admin/enquiries/status")
+async def update_enquiry_status(transition: EnquiryTransition, admin: User = Depends(get_admin_user)):
+    ids = list(dict.fromkeys(transition.ids))
+    updated, pending_delta = await transition_enquiries(ids, transition.status)
+    if updated:
+        admin_events.publish("enquiry_status", {"status": transition.status, "updated": updated})
+    if pending_delta:
+        admin_events.publish_stats(pending_enquiries=pending_delta)
+    return {"status": transition.status, "updated": updated, "skipped": len(ids) - updated}
+
+@api_router.post("/admin/events/token")
+async def create_admin_stream_token(admin: User = Depends(get_admin_user)):
+    token = create_access_token(
+        data={"sub": admin.email, "typ": "admin_stream"},
+        expires_delta=timedelta(seconds=ADMIN_STREAM_TOKEN_SECONDS)
+    )
+    return {"token": token, "expires_in": ADMIN_STREAM_TOKEN_SECONDS}
+
+@api_router.get("/admin/events")
+async def stream_admin_events(request: Request, admin: User = Depends(get_admin_stream_user)):
+    queue = admin_events.subscribe()
+
+    async def event_stream():
+        try:
+            yield f"retry: {SSE_KEEPALIVE_SECONDS * 1000}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            admin_events.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @api_router.get("/admin/users", response_model=List[User])
-async def get_all_users(admin: User = Depends(get_admin_user)):
+async def get_all_users(fields: Optional[str] = None, admin: User = Depends(get_admin_user)):
+    requested = USER_FIELDS.parse(fields)
+    if requested:
+        users = await db.users.find({}, USER_FIELDS.projection(requested)).to_list(1000)
+        return USER_FIELDS.response(requested, USER_FIELDS.trim(requested, users))
     users = await db.users.find({}, {"_id": 0, "password": 0}).to_list(1000)
     return [User(**u) for u in users]
 
+@api_router.get("/admin/metrics/concurrency")
+async def get_concurrency_metrics(admin: User = Depends(get_admin_user)):
+    return {name: limit.metrics() for name, limit in route_limits.items()}
+
+@api_router.get("/admin/metrics/cache")
+async def get_cache_metrics(admin: User = Depends(get_admin_user)):
+    return {
+        "catalog_entries": len(catalog_cache.entries),
+        "catalog_version": catalog_cache.version,
+        "user_entries": len(user_cache.entries),
+        "invalidation_bus": invalidation_bus.metrics()
+    }
+
+@api_router.get("/admin/metrics/jobs")
+async def get_job_metrics(admin: User = Depends(get_admin_user)):
+    return await job_queue.metrics()
+
+@api_router.get("/admin/metrics/compression")
+async def get_compression_metrics(admin: User = Depends(get_admin_user)):
+    return compression_stats.metrics()
+
 @api_router.get("/admin/stats")
 async def get_admin_stats(admin: User = Depends(get_admin_user)):
     total_users = await db.users.count_documents({"role": "customer"})
@@ -395,27 +1118,90 @@ async def get_admin_stats(admin: User = Depends(get_admin_user)):
         "pending_enquiries": pending_enquiries
     }
 
+def merge_carts(docs: list) -> dict:
+    quantities = {}
+    for doc in docs:
+        for item in doc.get("items", []):
+            line = (item["product_id"], item["size"])
+            quantities[line] = quantities.get(line, 0) + item["quantity"]
+    return {"items": [{"product_id": p, "size": s, "quantity": q} for (p, s), q in quantities.items()]}
+
+def merge_wishlists(docs: list) -> dict:
+    return {"product_ids": list(dict.fromkeys(pid for doc in docs for pid in doc.get("product_ids", [])))}
+
+async def ensure_unique_user_index(collection, merge):
+    """Fold duplicate per-user docs into one, then make user_id unique.
+
+    Schema 4 and earlier indexed user_id without uniqueness, so racing upserts could
+    create a second doc; the old index shares the new one's name and must be dropped.
+    """
+    info = await collection.index_information()
+    if "user_id_1" in info and not info["user_id_1"].get("unique"):
+        await collection.drop_index("user_id_1")
+    async for group in collection.aggregate([
+        {"$group": {"_id": "$user_id", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ]):
+        docs = await collection.find({"_id": {"$in": group["ids"]}}).sort("_id", 1).to_list(None)
+        await collection.update_one({"_id": docs[0]["_id"]},
+                                    {"$set": merge(docs), "$currentDate": {"updated_at": True}})
+        await collection.delete_many({"_id": {"$in": [doc["_id"] for doc in docs[1:]]}})
+    await collection.create_index("user_id", unique=True)
+
+async def ensure_indexes():
+    await ensure_unique_user_index(db.carts, merge_carts)
+    await db.carts.create_index("updated_at")
+    await ensure_unique_user_index(db.wishlists, merge_wishlists)
+    await db.wishlists.create_index("updated_at")
+    # Multikey indexes so deletion cascades only touch documents holding the product
+    await db.carts.create_index("items.product_id")
+    await db.wishlists.create_index("product_ids")
+    await db.collections.create_index("product_ids")
+    await job_queue.ensure_indexes()
+    await db.products.create_index("id")
+    # Sort-aligned indexes: equality on category (if any) then the sort keys, so
+    # sorted top-k reads walk the index instead of sorting in memory
+    for index in PRODUCT_SORT_INDEXES.values():
+        await db.products.create_index(index)
+        await db.products.create_index([("category", 1)] + index)
+    await db.collections.create_index("id")
+    await db.users.create_index("email")
+    # Admin triage: each filter is an equality prefix on the (created_at, id) page order
+    await db.enquiries.create_index(ENQUIRY_ORDER_INDEX)
+    await db.enquiries.create_index([("status", 1)] + ENQUIRY_ORDER_INDEX)
+    await db.enquiries.create_index([("product_id", 1)] + ENQUIRY_ORDER_INDEX)
+    await db.enquiries.create_index([("status", 1), ("product_id", 1)] + ENQUIRY_ORDER_INDEX)
+    await db.enquiries.create_index("id")
+    await db.enquiries.create_index("user_id")
+
+def seed_id(name: str) -> str:
+    return str(uuid.uuid5(SEED_NAMESPACE, name))
+
 async def init_admin():
     admin_email = "admin@luxe.com"
-    existing_admin = await db.users.find_one({"email": admin_email})
+    existing_admin = await db.users.find_one({"email": admin_email}, {"_id": 1})
     
     if not existing_admin:
         admin_user = User(
+            id=seed_id(admin_email),
             email=admin_email,
             name="Administrator",
             role="admin"
         )
         admin_doc = admin_user.model_dump()
-        admin_doc["password"] = hash_password("Admin123")
-        await db.users.insert_one(admin_doc)
-        logging.info(f"Admin user created with email: {admin_email} and password: Admin123")
+        admin_doc["password"] = await asyncio.to_thread(hash_password, "Admin123")
+        result = await db.users.update_one({"email": admin_email}, {"$setOnInsert": admin_doc}, upsert=True)
+        if result.upserted_id:
+            logging.info(f"Admin user created with email: {admin_email} and password: Admin123")
 
 async def init_sample_data():
+    from pymongo import UpdateOne
+
     product_count = await db.products.count_documents({})
     if product_count == 0:
         sample_products = [
             {
-                "id": str(uuid.uuid4()),
+                "id": seed_id("Classic White Shirt"),
                 "name": "Classic White Shirt",
                 "description": "Timeless white cotton shirt with clean lines and premium finish",
                 "price": 129.99,
@@ -426,7 +1212,7 @@ async def init_sample_data():
                 "created_at": datetime.now(timezone.utc).isoformat()
             },
             {
-                "id": str(uuid.uuid4()),
+                "id": seed_id("Tailored Black Blazer"),
                 "name": "Tailored Black Blazer",
                 "description": "Sophisticated black blazer with impeccable tailoring",
                 "price": 349.99,
@@ -437,7 +1223,7 @@ async def init_sample_data():
                 "created_at": datetime.now(timezone.utc).isoformat()
             },
             {
-                "id": str(uuid.uuid4()),
+                "id": seed_id("Silk Evening Dress"),
                 "name": "Silk Evening Dress",
                 "description": "Elegant silk dress perfect for special occasions",
                 "price": 599.99,
@@ -448,7 +1234,7 @@ async def init_sample_data():
                 "created_at": datetime.now(timezone.utc).isoformat()
             },
             {
-                "id": str(uuid.uuid4()),
+                "id": seed_id("Cashmere Sweater"),
                 "name": "Cashmere Sweater",
                 "description": "Luxuriously soft cashmere sweater in neutral tones",
                 "price": 249.99,
@@ -459,7 +1245,7 @@ async def init_sample_data():
                 "created_at": datetime.now(timezone.utc).isoformat()
             },
             {
-                "id": str(uuid.uuid4()),
+                "id": seed_id("Wool Trench Coat"),
                 "name": "Wool Trench Coat",
                 "description": "Classic trench coat crafted from premium wool",
                 "price": 499.99,
@@ -470,7 +1256,7 @@ async def init_sample_data():
                 "created_at": datetime.now(timezone.utc).isoformat()
             },
             {
-                "id": str(uuid.uuid4()),
+                "id": seed_id("Linen Summer Dress"),
                 "name": "Linen Summer Dress",
                 "description": "Breathable linen dress with flowing silhouette",
                 "price": 189.99,
@@ -481,11 +1267,13 @@ async def init_sample_data():
                 "created_at": datetime.now(timezone.utc).isoformat()
             }
         ]
-        await db.products.insert_many(sample_products)
+        await db.products.bulk_write([
+            UpdateOne({"id": p["id"]}, {"$setOnInsert": p}, upsert=True) for p in sample_products
+        ])
         
         sample_collections = [
             {
-                "id": str(uuid.uuid4()),
+                "id": seed_id("Spring Collection"),
                 "name": "Spring Collection",
                 "description": "Fresh styles for the new season",
                 "image": "https://images.unsplash.com/photo-1769107805528-964f4de0e342?w=800",
@@ -493,7 +1281,7 @@ async def init_sample_data():
                 "created_at": datetime.now(timezone.utc).isoformat()
             },
             {
-                "id": str(uuid.uuid4()),
+                "id": seed_id("Evening Wear"),
                 "name": "Evening Wear",
                 "description": "Sophisticated pieces for special occasions",
                 "image": "https://images.unsplash.com/photo-1767334010488-83cdb8539273?w=800",
@@ -501,23 +1289,39 @@ async def init_sample_data():
                 "created_at": datetime.now(timezone.utc).isoformat()
             }
         ]
-        await db.collections.insert_many(sample_collections)
+        await db.collections.bulk_write([
+            UpdateOne({"id": c["id"]}, {"$setOnInsert": c}, upsert=True) for c in sample_collections
+        ])
         logging.info("Sample data created")
 
-@app.on_event("startup")
-async def startup_event():
+async def seed_database():
+    await invalidation_bus.ensure_collection()
+    await ensure_indexes()
     await init_admin()
     await init_sample_data()
 
-app.include_router(api_router)
+async def init_database():
+    # Only one worker seeds and migrates; the rest wait for it to finish
+    await run_with_lease(db.startup_locks, "seed", SCHEMA_VERSION, seed_database)
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+async def run_recommender():
+    global recommender
+    # numpy is the heaviest import here; load it off the event loop after startup
+    recommendations = await asyncio.to_thread(importlib.import_module, "recommendations")
+    recommender = recommendations.CooccurrenceRecommender(top_k=RECOMMENDATIONS_TOP_K)
+    await recommender.run(db, RECOMMENDATIONS_REFRESH_SECONDS)
+
+async def startup_event():
+    await init_database()
+    background_tasks.append(asyncio.create_task(invalidation_bus.run()))
+    background_tasks.append(asyncio.create_task(run_recommender()))
+    background_tasks.append(asyncio.create_task(job_queue.run()))
+
+async def shutdown_db_client():
+    for task in background_tasks:
+        task.cancel()
+    image_pipeline.shutdown()
+    db.close()
 
 logging.basicConfig(
     level=logging.INFO,
@@ -525,6 +1329,36 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+def create_app() -> FastAPI:
+    """Build the ASGI app; the database client is created when startup first uses it.
+
+    Serve with ``uvicorn --factory server:create_app``; ``server:app`` is kept for
+    existing deployments.
+    """
+    app = FastAPI()
+    app.include_router(api_router)
+
+    app.add_middleware(ConcurrencyLimitMiddleware, limits=route_limits, classify=route_group)
+
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=COMPRESSION_MINIMUM_SIZE,
+        cacheable=is_catalog_response,
+        cache_version=lambda: catalog_cache.version,
+        stats=compression_stats
+    )
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor"],
+    )
+
+    app.add_event_handler("startup", startup_event)
+    app.add_event_handler("shutdown", shutdown_db_client)
+    return app
+
+app = create_app()
@@ -0,0 +1,517 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+
+
+def print_header(title):
+    print(f"\n{'='*60}")
+    print(f"📊 {title}")
+    print(f"{'='*60}")
+
+
+def synthetic_baskets(users, products, seed=42):
+    rng = random.Random(seed)
+    catalog = [f"product-{i}" for i in range(products)]
+    # Long-tailed popularity, like a real catalog
+    weights = [1 / (rank + 1) for rank in range(products)]
+    return {
+        f"user-{u}": rng.choices(catalog, weights=weights, k=rng.randint(1, 12))
+        for u in range(users)
+    }
+
+
+def bench_recommendations(args):
+    from recommendations import CooccurrenceRecommender
+
+    print_header(f"Recommendations rebuild: {args.users} users, {args.products} products")
+    baskets = synthetic_baskets(args.users, args.products)
+
+    recommender = CooccurrenceRecommender(top_k=8)
+    tracemalloc.start()
+    started = time.perf_counter()
+    recommender.apply_baskets(baskets)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"Full rebuild:        {elapsed:.2f}s")
+    print(f"Peak memory:         {peak / 1024 / 1024:.1f} MiB")
+    print(f"Non-zero pairs:      {recommender.codes.size}")
+    print(f"Matrix footprint:    {(recommender.codes.nbytes + recommender.counts.nbytes) / 1024 / 1024:.1f} MiB")
+
+    changed = synthetic_baskets(args.users // 100, args.products, seed=7)
+    started = time.perf_counter()
+    recommender.apply_baskets(changed)
+    print(f"Incremental (1%):    {time.perf_counter() - started:.2f}s for {len(changed)} baskets")
+
+
+def _boot_worker(db_name, spawned_at, results):
+    os.environ["DB_NAME"] = db_name
+    import server
+
+    asyncio.run(server.init_database())
+    results.put(time.time() - spawned_at)
+
+
+def _drop_database(db_name):
+    from pymongo import MongoClient
+
+    MongoClient(os.environ["MONGO_URL"]).drop_database(db_name)
+
+
+def bench_startup(args):
+    if "MONGO_URL" not in os.environ:
+        print("❌ MONGO_URL must point at a MongoDB instance")
+        return 1
+
+    context = multiprocessing.get_context("spawn")
+    for workers in args.workers:
+        db_name = f"luxe_bench_startup_{workers}_{os.getpid()}"
+        print_header(f"Startup with {workers} workers")
+        for phase in ("cold", "warm"):
+            results = context.Queue()
+            spawned_at = time.time()
+            processes = [
+                context.Process(target=_boot_worker, args=(db_name, spawned_at, results))
+                for _ in range(workers)
+            ]
+            for process in processes:
+                process.start()
+            ready = sorted(results.get() for _ in processes)
+            for process in processes:
+                process.join()
+            print(f"{phase:>5}: first ready {ready[0]:.2f}s, all ready {ready[-1]:.2f}s")
+        _drop_database(db_name)
+    return 0
+
+
+def _test_image(index, width=2400, height=3200):
+    from PIL import Image, ImageFilter
+
+    # Smooth gradients plus grain compress roughly like product photography
+    base = Image.linear_gradient("L").resize((width, height)).rotate(index * 17 % 360)
+    noise = Image.effect_noise((width // 4, height // 4), 40 + index % 20).resize((width, height))
+    return Image.merge("RGB", (base, noise, Image.blend(base, noise, 0.5))).filter(ImageFilter.GaussianBlur(1))
+
+
+def bench_images(args):
+    import io
+    from images import ImagePipeline, variant_formats
+
+    print_header(f"Image variants: {args.images} uploads, {args.workers or os.cpu_count()} workers")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        pipeline = ImagePipeline(cache_dir, workers=args.workers)
+        originals = {}
+        for index in range(args.images):
+            buffer = io.BytesIO()
+            _test_image(index).save(buffer, format="JPEG", quality=90)
+            originals[pipeline.store_original(buffer.getvalue())] = len(buffer.getvalue())
+
+        async def render_all():
+            return await asyncio.gather(*(pipeline.render(digest) for digest in originals))
+
+        started = time.perf_counter()
+        rendered = asyncio.run(render_all())
+        elapsed = time.perf_counter() - started
+        pipeline.shutdown()
+
+    variants = sum(len(r) for r in rendered)
+    print(f"Rendered:            {variants} variants ({', '.join(variant_formats())}) in {elapsed:.2f}s")
+    print(f"Throughput:          {args.images / elapsed:.1f} uploads/s, {variants / elapsed:.1f} variants/s")
+
+    card_width = 640
+    page = list(zip(originals.values(), rendered))[:args.cards_per_page]
+    original_bytes = sum(size for size, _ in page)
+    variant_bytes = sum(next(b for w, f, b in r if w == card_width and f == "webp") for _, r in page)
+    print(f"Page of {len(page)} cards:    {original_bytes / 1024:.0f} KiB original -> "
+          f"{variant_bytes / 1024:.0f} KiB at {card_width}w webp "
+          f"({100 * (1 - variant_bytes / original_bytes):.1f}% saved)")
+
+
+def _catalog_body(products):
+    import json
+
+    return json.dumps([
+        {
+            "id": f"product-{i}",
+            "name": f"Product {i}",
+            "description": "Timeless cotton piece with clean lines and a premium finish, cut for everyday wear",
+            "price": 100 + i * 1.5,
+            "category": ["Shirts", "Dresses", "Coats", "Sweaters"][i % 4],
+            "sizes": ["S", "M", "L", "XL"],
+            "images": [f"https://images.unsplash.com/photo-{1596755094514 + i}?w=800"],
+            "availability": True,
+            "created_at": "2026-01-01T00:00:00+00:00",
+        }
+        for i in range(products)
+    ]).encode()
+
+
+def bench_compression(args):
+    from compression import CompressionMiddleware, CompressionStats, brotli
+
+    body = _catalog_body(args.products)
+
+    async def catalog_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def run(middleware, encoding):
+        sent = []
+
+        async def send(message):
+            if message["type"] == "http.response.body":
+                sent.append(len(message["body"]))
+
+        scope = {"type": "http", "method": "GET", "path": "/api/products", "query_string": b"",
+                 "headers": [(b"accept-encoding", encoding.encode())]}
+        started = time.process_time()
+        for _ in range(args.requests):
+            await middleware(scope, receive, send)
+        return (time.process_time() - started) / args.requests, sum(sent) / args.requests
+
+    print_header(f"Compression: {args.products}-product catalog ({len(body) / 1024:.0f} KiB), {args.requests} requests")
+    encodings = ["identity", "gzip"] + (["br"] if brotli else [])
+    for encoding in encodings:
+        for cached in (False, True):
+            if encoding == "identity" and cached:
+                continue
+            middleware = CompressionMiddleware(
+                catalog_app, cacheable=lambda scope, cached=cached: cached, stats=CompressionStats()
+            )
+            cpu, sent = asyncio.run(run(middleware, encoding))
+            label = f"{encoding}{' + cache' if cached else ''}"
+            print(f"{label:<16} {sent / 1024:8.1f} KiB/request  {cpu * 1000:8.3f} ms CPU/request")
+
+
+def bench_fieldsets(args):
+    import gzip
+    import json
+    import statistics
+
+    from pydantic import TypeAdapter
+    from typing import List
+    import server
+
+    docs = json.loads(_catalog_body(args.products))
+    for doc in docs:
+        doc["images"] = [f"{doc['images'][0]}&view={view}" for view in range(args.images)]
+    full = TypeAdapter(List[server.Product])
+    requested = server.PRODUCT_FIELDS.parse(args.fields)
+    projection = server.PRODUCT_FIELDS.projection(requested)
+    # Apply the projection the way Mongo would, so trimming sees only projected data
+    projected = [
+        {k: (v[:1] if isinstance(projection.get(k), dict) else v) for k, v in doc.items() if k in projection}
+        for doc in docs
+    ]
+
+    def serialize_full():
+        return full.dump_json(full.validate_python(docs))
+
+    def serialize_trimmed():
+        return server.PRODUCT_FIELDS.adapter(requested).dump_json(server.PRODUCT_FIELDS.trim(requested, projected))
+
+    print_header(f"Sparse fieldsets: {args.products} products x {args.images} images, fields={args.fields}")
+    for label, serialize in (("full", serialize_full), ("fields", serialize_trimmed)):
+        body = serialize()
+        started = time.process_time()
+        for _ in range(args.requests):
+            serialize()
+        cpu = (time.process_time() - started) / args.requests
+        print(f"{label:<8} {len(body) / 1024:8.1f} KiB  {len(gzip.compress(body)) / 1024:7.1f} KiB gzip  "
+              f"{cpu * 1000:7.2f} ms serialize/request")
+
+    if args.url:
+        import httpx
+
+        with httpx.Client(base_url=args.url, timeout=30) as http:
+            for label, params in (("full", {}), ("fields", {"fields": args.fields})):
+                latencies, size = [], 0
+                for _ in range(args.requests):
+                    started = time.perf_counter()
+                    response = http.get("/api/products", params=params)
+                    latencies.append(time.perf_counter() - started)
+                    size = len(response.content)
+                latencies.sort()
+                print(f"{label:<8} live {size / 1024:8.1f} KiB  p50 {statistics.median(latencies) * 1000:7.2f} ms  "
+                      f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.2f} ms")
+    return 0
+
+
+BACKEND = Path(__file__).parent / "backend"
+
+
+def _rss_mb(pid):
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _import_breakdown():
+    """Cumulative -X importtime per module imported directly by server, plus the total."""
+    report = "from pathlib import Path; print(next(l for l in Path('/proc/self/status').read_text().splitlines() if l.startswith('VmRSS:')))"
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import server; {report}"],
+        cwd=BACKEND, capture_output=True, text=True, check=True,
+    )
+    direct, total = [], 0
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0 and name.strip() == "server":
+            total = int(cumulative)
+            break
+        if depth == 0:
+            # Imported at interpreter startup (site, .pth hooks), not by the server
+            direct = []
+        elif depth == 1:
+            direct.append((int(cumulative), name.strip()))
+    rss = int(process.stdout.split()[-2]) / 1024
+    return total, sorted(direct, reverse=True), rss
+
+
+def _first_request(url, port, factory):
+    target = ["--factory", "server:create_app"] if factory else ["server:app"]
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", *target, "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND,
+    )
+    try:
+        while True:
+            try:
+                with urllib.request.urlopen(f"{url}/api/products?limit=1", timeout=1) as response:
+                    response.read()
+                break
+            except (urllib.error.URLError, ConnectionError):
+                if process.poll() is not None:
+                    raise RuntimeError("server exited before answering")
+                time.sleep(0.01)
+        return time.perf_counter() - started, _rss_mb(process.pid)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def bench_coldstart(args):
+    print_header("Cold start: import cost of the server module")
+    total, direct, rss = _import_breakdown()
+    for cumulative, name in direct[:args.top]:
+        print(f"{name:<28} {cumulative / 1000:8.1f} ms")
+    print(f"{'import server':<28} {total / 1000:8.1f} ms   RSS {rss:6.1f} MB")
+
+    if "MONGO_URL" not in os.environ:
+        print("⚠️  Set MONGO_URL to also time the first request")
+        return 0
+    print_header("Cold start: uvicorn spawn to first /api/products response")
+    url = f"http://127.0.0.1:{args.port}"
+    for factory in (False, True):
+        label = "--factory create_app" if factory else "server:app"
+        timings = [_first_request(url, args.port, factory) for _ in range(args.runs)]
+        elapsed = sorted(t for t, _ in timings)[len(timings) // 2]
+        print(f"{label:<22} first response {elapsed:6.2f}s (median of {args.runs})   "
+              f"RSS {max(r for _, r in timings):6.1f} MB")
+    return 0
+
+
+def bench_cascade(args):
+    if "MONGO_URL" not in os.environ:
+        print("❌ MONGO_URL must point at a MongoDB instance")
+        return 1
+    db_name = f"luxe_bench_cascade_{os.getpid()}"
+    os.environ["DB_NAME"] = db_name
+    import server
+
+    baskets = list(synthetic_baskets(args.carts, args.products).items())
+    doomed = [f"product-{i}" for i in random.Random(7).sample(range(args.products), args.deletes)]
+
+    async def seed():
+        await server.db.drop_collection("jobs")
+        await server.db.carts.delete_many({})
+        await server.db.wishlists.delete_many({})
+        await server.db.collections.delete_many({})
+        for start in range(0, len(baskets), 10_000):
+            chunk = baskets[start:start + 10_000]
+            await server.db.carts.insert_many([
+                {"user_id": user_id, "items": [{"product_id": p, "size": "M", "quantity": 1} for p in basket]}
+                for user_id, basket in chunk
+            ])
+            await server.db.wishlists.insert_many([
+                {"user_id": user_id, "product_ids": basket[:3]} for user_id, basket in chunk
+            ])
+        await server.db.collections.insert_many([
+            {"id": f"collection-{c}", "product_ids": [f"product-{i}" for i in range(c * 50, c * 50 + 50)]}
+            for c in range(args.products // 50)
+        ])
+
+    async def dead_references():
+        return (await server.db.carts.count_documents({"items.product_id": {"$in": doomed}})
+                + await server.db.wishlists.count_documents({"product_ids": {"$in": doomed}}))
+
+    async def run():
+        await server.ensure_indexes()
+        print_header(f"Deletion cascade: {args.carts} carts, {args.deletes} deleted products")
+        for label, batches in (("one job per product", [[p] for p in doomed]), ("one batched job", [doomed])):
+            await seed()
+            references = await dead_references()
+            started = time.perf_counter()
+            for batch in batches:
+                await server.job_queue.enqueue("cascade_product_deletion", {"product_ids": batch})
+            enqueued = time.perf_counter() - started
+            started = time.perf_counter()
+            await server.job_queue.run_pending()
+            elapsed = time.perf_counter() - started
+            left = await dead_references()
+            print(f"{label:<20} enqueue {enqueued / len(batches) * 1000:6.2f} ms/job  "
+                  f"cleanup {elapsed:6.2f}s  {references / elapsed:9.0f} refs/s  ({left} left)")
+        await server.db.client.drop_database(db_name)
+
+    asyncio.run(run())
+    return 0
+
+
+def bench_enquiries(args):
+    if "MONGO_URL" not in os.environ:
+        print("❌ MONGO_URL must point at a MongoDB instance")
+        return 1
+    db_name = f"luxe_bench_enquiries_{os.getpid()}"
+    os.environ["DB_NAME"] = db_name
+    from datetime import datetime, timedelta, timezone
+    import statistics
+    import server
+
+    rng = random.Random(42)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    statuses = ["pending"] * 5 + ["in_progress"] * 2 + ["resolved"] * 2 + ["closed"]
+
+    async def seed():
+        for offset in range(0, args.enquiries, 10_000):
+            await server.db.enquiries.insert_many([
+                {
+                    "id": f"enquiry-{i:07d}",
+                    "user_id": f"user-{rng.randrange(50_000)}",
+                    "product_id": f"product-{rng.randrange(args.products)}",
+                    "message": "Is this available in another size?",
+                    "status": rng.choice(statuses),
+                    "user_name": "Customer",
+                    "user_email": "customer@example.com",
+                    "created_at": (start + timedelta(seconds=rng.randrange(365 * 86400))).isoformat(),
+                }
+                for i in range(offset, min(offset + 10_000, args.enquiries))
+            ])
+
+    async def timed_pages(filters):
+        latencies, cursor = [], None
+        for _ in range(args.pages):
+            started = time.perf_counter()
+            query = server.enquiry_query(**filters, cursor=cursor)
+            page = await server.find_enquiries(query, {"_id": 0}, server.ENQUIRY_PAGE_SIZE).to_list(None)
+            latencies.append(time.perf_counter() - started)
+            if len(page) < server.ENQUIRY_PAGE_SIZE:
+                break
+            cursor = server.encode_enquiry_cursor(page[-1])
+        return latencies
+
+    async def run():
+        await server.ensure_indexes()
+        await seed()
+        print_header(f"Enquiry triage: {args.enquiries} enquiries, {args.pages} pages per filter")
+        scenarios = {
+            "all": {},
+            "status=pending": {"status": "pending"},
+            "product": {"product_id": "product-7"},
+            "status + 30 days": {"status": "in_progress", "created_after": start + timedelta(days=200),
+                                 "created_before": start + timedelta(days=230)},
+        }
+        for label, filters in scenarios.items():
+            latencies = await timed_pages(filters)
+            print(f"{label:<18} first page {latencies[0] * 1000:7.2f} ms  "
+                  f"p50 {statistics.median(latencies) * 1000:7.2f} ms  last {latencies[-1] * 1000:7.2f} ms  "
+                  f"({len(latencies)} pages)")
+
+        ids = [f"enquiry-{i:07d}" for i in rng.sample(range(args.enquiries), server.MAX_ENQUIRY_TRANSITION_IDS)]
+        started = time.perf_counter()
+        updated, pending_delta = await server.transition_enquiries(ids, "resolved")
+        print(f"bulk transition    {len(ids)} ids in {(time.perf_counter() - started) * 1000:.2f} ms "
+              f"({updated} updated, pending {pending_delta:+d})")
+        await server.db.client.drop_database(db_name)
+
+    asyncio.run(run())
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LUXE backend benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    recommendations = subparsers.add_parser("recommendations", help="co-occurrence rebuild time and memory")
+    recommendations.add_argument("--users", type=int, default=100_000)
+    recommendations.add_argument("--products", type=int, default=5_000)
+    recommendations.set_defaults(func=bench_recommendations)
+
+    startup = subparsers.add_parser("startup", help="worker-ready time with the seeding leader lease")
+    startup.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    startup.set_defaults(func=bench_startup)
+
+    images = subparsers.add_parser("images", help="variant rendering throughput and bytes saved per page")
+    images.add_argument("--images", type=int, default=24)
+    images.add_argument("--workers", type=int, default=None)
+    images.add_argument("--cards-per-page", type=int, default=12)
+    images.set_defaults(func=bench_images)
+
+    compression = subparsers.add_parser("compression", help="bandwidth and CPU per catalog request")
+    compression.add_argument("--products", type=int, default=500)
+    compression.add_argument("--requests", type=int, default=200)
+    compression.set_defaults(func=bench_compression)
+
+    cascade = subparsers.add_parser("cascade", help="product-deletion cleanup throughput through the job queue")
+    cascade.add_argument("--carts", type=int, default=100_000)
+    cascade.add_argument("--products", type=int, default=5_000)
+    cascade.add_argument("--deletes", type=int, default=50)
+    cascade.set_defaults(func=bench_cascade)
+
+    enquiries = subparsers.add_parser("enquiries", help="admin enquiry paging and bulk transitions on a large backlog")
+    enquiries.add_argument("--enquiries", type=int, default=500_000)
+    enquiries.add_argument("--products", type=int, default=5_000)
+    enquiries.add_argument("--pages", type=int, default=20)
+    enquiries.set_defaults(func=bench_enquiries)
+
+    fieldsets = subparsers.add_parser("fieldsets", help="payload size and latency of product-card field selections")
+    fieldsets.add_argument("--products", type=int, default=500)
+    fieldsets.add_argument("--requests", type=int, default=50)
+    fieldsets.add_argument("--images", type=int, default=4, help="gallery images per product")
+    fieldsets.add_argument("--fields", default="id,name,price,category,availability,cover_image,cover_srcset")
+    fieldsets.add_argument("--url", help="also time GET /api/products against a running server")
+    fieldsets.set_defaults(func=bench_fieldsets)
+
+    coldstart = subparsers.add_parser("coldstart", help="import time, time to first request and RSS after boot")
+    coldstart.add_argument("--top", type=int, default=12, help="slowest direct imports to list")
+    coldstart.add_argument("--runs", type=int, default=3)
+    coldstart.add_argument("--port", type=int, default=8765)
+    coldstart.set_defaults(func=bench_coldstart)
+
+    args = parser.parse_args()
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
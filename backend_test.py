@@ -12,6 +12,7 @@ class LuxeFashionAPITester:
         self.tests_passed = 0
         self.test_user_id = None
         self.test_product_id = None
+        self.test_enquiry_id = None
 
     def run_test(self, name, method, endpoint, expected_status, data=None, headers=None):
         """Run a single API test"""
@@ -172,7 +173,42 @@ class LuxeFashionAPITester:
             200
         )
         
-        return all([success1, success2, success3, success4, success5])
+        # Test index-backed sort with a limit
+        success6, response = self.run_test(
+            "Product Sort by Price with Limit",
+            "GET",
+            "products?sort=price_asc&limit=3",
+            200
+        )
+        if success6:
+            prices = [p["price"] for p in response]
+            if len(prices) > 3 or prices != sorted(prices):
+                print(f"❌ Expected at most 3 products in price order, got {prices}")
+                success6 = False
+
+        return all([success1, success2, success3, success4, success5, success6])
+
+    def test_product_fieldsets(self):
+        """Test sparse fieldsets on product listings"""
+        success1, response = self.run_test(
+            "Product Card Fields",
+            "GET",
+            "products?fields=id,name,price,cover_image",
+            200
+        )
+        if success1 and response:
+            if set(response[0]) != {"id", "name", "price", "cover_image"}:
+                print(f"❌ Unexpected fields: {sorted(response[0])}")
+                success1 = False
+
+        success2, _ = self.run_test(
+            "Reject Unknown Field",
+            "GET",
+            "products?fields=id,password",
+            400
+        )
+
+        return all([success1, success2])
 
     def test_get_single_product(self):
         """Test get single product endpoint"""
@@ -299,6 +335,80 @@ class LuxeFashionAPITester:
         
         return all([success1, success2, success3, success4, success5])
 
+    def test_cart_batch_operations(self):
+        """Test batched cart and wishlist operations"""
+        if not self.test_product_id:
+            print("❌ No product ID available for batch testing")
+            return False
+
+        batch = {
+            "operations": [
+                {"target": "cart", "action": "add", "product_id": self.test_product_id, "size": "S", "quantity": 1},
+                {"target": "cart", "action": "add", "product_id": self.test_product_id, "size": "S", "quantity": 2},
+                {"target": "wishlist", "action": "add", "product_id": self.test_product_id}
+            ]
+        }
+        success1, response = self.run_test(
+            "Apply Cart Batch",
+            "POST",
+            "cart/batch",
+            200,
+            data=batch
+        )
+        if success1:
+            items = response.get("cart", {}).get("items", [])
+            item = next((i for i in items if i["product_id"] == self.test_product_id and i["size"] == "S"), None)
+            if not item or item["quantity"] != 3 or self.test_product_id not in response.get("wishlist", []):
+                print("❌ Batch result does not reflect the applied operations")
+                success1 = False
+
+        cleanup = {
+            "operations": [
+                {"target": "cart", "action": "remove", "product_id": self.test_product_id, "size": "S"},
+                {"target": "wishlist", "action": "remove", "product_id": self.test_product_id}
+            ]
+        }
+        success2, _ = self.run_test(
+            "Revert Cart Batch",
+            "POST",
+            "cart/batch",
+            200,
+            data=cleanup
+        )
+
+        return all([success1, success2])
+
+    def test_guest_cart_operations(self):
+        """Test signed guest cart tokens"""
+        if not self.test_product_id:
+            print("❌ No product ID available for guest cart testing")
+            return False
+
+        batch = {
+            "operations": [
+                {"target": "cart", "action": "add", "product_id": self.test_product_id, "size": "M", "quantity": 1}
+            ]
+        }
+        success1, response = self.run_test(
+            "Guest Cart Add",
+            "POST",
+            "guest/cart",
+            200,
+            data=batch
+        )
+        guest_token = response.get("token")
+
+        tampered = {"token": (guest_token or "") + "x", "operations": []}
+        success2, _ = self.run_test(
+            "Reject Tampered Guest Cart",
+            "POST",
+            "guest/cart",
+            400,
+            data=tampered
+        )
+
+        return all([success1, success2, bool(guest_token)])
+
     def test_enquiry_operations(self):
         """Test enquiry operations"""
         # Create enquiry
@@ -313,6 +423,8 @@ class LuxeFashionAPITester:
             200,
             data=enquiry_data
         )
+        if success1 and response:
+            self.test_enquiry_id = response.get('id')
         
         # Get user enquiries
         success2, _ = self.run_test(
@@ -358,6 +470,28 @@ class LuxeFashionAPITester:
             200,
             headers=admin_headers
         )
+
+        # Filter enquiries and move one through a status transition
+        success_filter, _ = self.run_test(
+            "Filter Enquiries by Status",
+            "GET",
+            f"admin/enquiries?status=pending&limit=10&product_id={self.test_product_id}",
+            200,
+            headers=admin_headers
+        )
+        success_transition = True
+        if self.test_enquiry_id:
+            success_transition, response = self.run_test(
+                "Bulk Enquiry Status Transition",
+                "POST",
+                "admin/enquiries/status",
+                200,
+                data={"ids": [self.test_enquiry_id], "status": "resolved"},
+                headers=admin_headers
+            )
+            if success_transition and response.get("updated") != 1:
+                print(f"❌ Expected one enquiry to be resolved, got {response}")
+                success_transition = False
         
         # Test product management
         new_product = {
@@ -406,8 +540,43 @@ class LuxeFashionAPITester:
             )
         else:
             success5 = success6 = False
+
+        # Deletion enqueues a background cleanup job
+        success7, _ = self.run_test(
+            "Job Queue Metrics (Admin)",
+            "GET",
+            "admin/metrics/jobs",
+            200,
+            headers=admin_headers
+        )
         
-        return all([success1, success2, success3, success4, success5, success6])
+        # The event stream only takes short-lived stream tokens in its URL
+        success_stream_token, response = self.run_test(
+            "Issue Admin Stream Token",
+            "POST",
+            "admin/events/token",
+            200,
+            headers=admin_headers
+        )
+        stream_token = response.get("token", "")
+        success_stream_login, _ = self.run_test(
+            "Reject Login Token in Stream URL",
+            "GET",
+            f"admin/events?token={self.admin_token}",
+            401,
+            headers={'Accept': 'text/event-stream'}
+        )
+        success_stream_scope, _ = self.run_test(
+            "Reject Stream Token as Bearer",
+            "GET",
+            "admin/stats",
+            401,
+            headers={'Authorization': f'Bearer {stream_token}'}
+        )
+
+        return all([success1, success2, success3, success4, success5, success6, success7,
+                    success_filter, success_transition,
+                    success_stream_token, success_stream_login, success_stream_scope])
 
 def main():
     print("🚀 Starting LUXE Fashion API Testing...")
@@ -420,10 +589,13 @@ def main():
         ("Get Current User", tester.test_get_current_user),
         ("Get Products", tester.test_get_products),
         ("Product Search & Filters", tester.test_product_search_filters),
+        ("Product Fieldsets", tester.test_product_fieldsets),
         ("Get Single Product", tester.test_get_single_product),
         ("Collections", tester.test_collections),
         ("Wishlist Operations", tester.test_wishlist_operations),
         ("Cart Operations", tester.test_cart_operations),
+        ("Cart Batch Operations", tester.test_cart_batch_operations),
+        ("Guest Cart Operations", tester.test_guest_cart_operations),
         ("Enquiry Operations", tester.test_enquiry_operations),
         ("Admin Operations", tester.test_admin_operations),
     ]
@@ -2,21 +2,18 @@ import React from 'react';
 import { Link } from 'react-router-dom';
 import { Heart } from 'lucide-react';
 import { useCart } from '../contexts/CartContext';
-import { useAuth } from '../contexts/AuthContext';
 import { toast } from 'sonner';
+import { assetUrl, assetSrcSet } from '../lib/utils';
+
+// Fields a card needs; listing pages request only these via ?fields=
+export const CARD_FIELDS = 'id,name,price,category,availability,cover_image,cover_srcset';
 
 const ProductCard = ({ product }) => {
   const { addToWishlist, removeFromWishlist, isInWishlist } = useCart();
-  const { isAuthenticated } = useAuth();
   const inWishlist = isInWishlist(product.id);
 
   const handleWishlistToggle = async (e) => {
     e.preventDefault();
-    if (!isAuthenticated) {
-      toast.error('Please login to add items to wishlist');
-      return;
-    }
-    
     try {
       if (inWishlist) {
         await removeFromWishlist(product.id);
@@ -38,7 +35,10 @@ const ProductCard = ({ product }) => {
     >
       <div className="relative overflow-hidden bg-secondary/20 aspect-[3/4] mb-4">
         <img
-          src={product.images[0]}
+          src={assetUrl(product.cover_image ?? product.images?.[0])}
+          srcSet={assetSrcSet(product.cover_srcset ?? product.image_srcset?.[0])}
+          sizes="(min-width: 1024px) 25vw, (min-width: 768px) 33vw, 50vw"
+          loading="lazy"
           alt={product.name}
           className="w-full h-full object-cover transition-transform duration-700 group-hover:scale-105"
           data-testid="product-image"
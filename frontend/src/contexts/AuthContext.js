@@ -3,6 +3,7 @@ import axios from 'axios';
 
 const AuthContext = createContext(null);
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+const GUEST_CART_KEY = 'guestCart';
 
 export const AuthProvider = ({ children }) => {
   const [user, setUser] = useState(null);
@@ -31,7 +32,12 @@ export const AuthProvider = ({ children }) => {
   };
 
   const login = async (email, password) => {
-    const response = await axios.post(`${API}/auth/login`, { email, password });
+    const response = await axios.post(`${API}/auth/login`, {
+      email,
+      password,
+      guest_cart: localStorage.getItem(GUEST_CART_KEY)
+    });
+    localStorage.removeItem(GUEST_CART_KEY);
     const { access_token, user: userData } = response.data;
     setToken(access_token);
     setUser(userData);
@@ -41,7 +47,11 @@ export const AuthProvider = ({ children }) => {
   };
 
   const register = async (userData) => {
-    const response = await axios.post(`${API}/auth/register`, userData);
+    const response = await axios.post(`${API}/auth/register`, {
+      ...userData,
+      guest_cart: localStorage.getItem(GUEST_CART_KEY)
+    });
+    localStorage.removeItem(GUEST_CART_KEY);
     const { access_token, user: newUser } = response.data;
     setToken(access_token);
     setUser(newUser);
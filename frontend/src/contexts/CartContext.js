@@ -1,9 +1,11 @@
-import React, { createContext, useState, useContext, useEffect } from 'react';
+import React, { createContext, useState, useContext, useEffect, useRef } from 'react';
 import axios from 'axios';
 import { useAuth } from './AuthContext';
 
 const CartContext = createContext(null);
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+const BATCH_DELAY_MS = 50;
+const GUEST_CART_KEY = 'guestCart';
 
 export const CartProvider = ({ children }) => {
   const [cart, setCart] = useState([]);
@@ -14,9 +16,36 @@ export const CartProvider = ({ children }) => {
     if (isAuthenticated) {
       fetchCart();
       fetchWishlist();
+    } else {
+      fetchGuestCart();
     }
   }, [isAuthenticated]);
 
+  const applyGuestOperations = async (operations) => {
+    const response = await axios.post(`${API}/guest/cart`, {
+      token: localStorage.getItem(GUEST_CART_KEY),
+      operations
+    });
+    localStorage.setItem(GUEST_CART_KEY, response.data.token);
+    return response;
+  };
+
+  const fetchGuestCart = async () => {
+    if (!localStorage.getItem(GUEST_CART_KEY)) {
+      setCart([]);
+      setWishlist([]);
+      return;
+    }
+    try {
+      const response = await applyGuestOperations([]);
+      setCart(response.data.cart.items || []);
+      setWishlist(response.data.wishlist || []);
+    } catch (error) {
+      console.error('Failed to restore guest cart:', error);
+      localStorage.removeItem(GUEST_CART_KEY);
+    }
+  };
+
   const fetchCart = async () => {
     try {
       const response = await axios.get(`${API}/cart`);
@@ -35,10 +64,45 @@ export const CartProvider = ({ children }) => {
     }
   };
 
+  const pendingOps = useRef([]);
+  const flushTimer = useRef(null);
+  const inFlight = useRef(Promise.resolve());
+
+  const sendBatch = async () => {
+    const batch = pendingOps.current;
+    pendingOps.current = [];
+    if (!batch.length) return;
+    const operations = batch.map(({ operation }) => operation);
+    try {
+      const response = isAuthenticated
+        ? await axios.post(`${API}/cart/batch`, { operations })
+        : await applyGuestOperations(operations);
+      setCart(response.data.cart.items || []);
+      setWishlist(response.data.wishlist || []);
+      batch.forEach(({ resolve }) => resolve());
+    } catch (error) {
+      batch.forEach(({ reject }) => reject(error));
+    }
+  };
+
+  // Batches are sent one at a time: a guest batch rewrites the whole signed token, and
+  // the response of an overlapping request could otherwise roll the UI back.
+  const flushOperations = () => {
+    flushTimer.current = null;
+    inFlight.current = inFlight.current.then(sendBatch);
+  };
+
+  // Operations issued in quick succession are coalesced into one batch request
+  const enqueueOperation = (operation) => new Promise((resolve, reject) => {
+    pendingOps.current.push({ operation, resolve, reject });
+    if (!flushTimer.current) {
+      flushTimer.current = setTimeout(flushOperations, BATCH_DELAY_MS);
+    }
+  });
+
   const addToCart = async (productId, size, quantity = 1) => {
     try {
-      await axios.post(`${API}/cart/add`, { product_id: productId, size, quantity });
-      await fetchCart();
+      await enqueueOperation({ target: 'cart', action: 'add', product_id: productId, size, quantity });
     } catch (error) {
       console.error('Failed to add to cart:', error);
       throw error;
@@ -47,8 +111,7 @@ export const CartProvider = ({ children }) => {
 
   const updateCart = async (productId, size, quantity) => {
     try {
-      await axios.put(`${API}/cart/update`, { product_id: productId, size, quantity });
-      await fetchCart();
+      await enqueueOperation({ target: 'cart', action: 'update', product_id: productId, size, quantity });
     } catch (error) {
       console.error('Failed to update cart:', error);
       throw error;
@@ -57,8 +120,7 @@ export const CartProvider = ({ children }) => {
 
   const removeFromCart = async (productId, size) => {
     try {
-      await axios.delete(`${API}/cart/remove/${productId}?size=${size}`);
-      await fetchCart();
+      await enqueueOperation({ target: 'cart', action: 'remove', product_id: productId, size });
     } catch (error) {
       console.error('Failed to remove from cart:', error);
       throw error;
@@ -67,8 +129,7 @@ export const CartProvider = ({ children }) => {
 
   const addToWishlist = async (productId) => {
     try {
-      await axios.post(`${API}/wishlist/add`, { product_id: productId });
-      await fetchWishlist();
+      await enqueueOperation({ target: 'wishlist', action: 'add', product_id: productId });
     } catch (error) {
       console.error('Failed to add to wishlist:', error);
       throw error;
@@ -77,8 +138,7 @@ export const CartProvider = ({ children }) => {
 
   const removeFromWishlist = async (productId) => {
     try {
-      await axios.delete(`${API}/wishlist/remove/${productId}`);
-      await fetchWishlist();
+      await enqueueOperation({ target: 'wishlist', action: 'remove', product_id: productId });
     } catch (error) {
       console.error('Failed to remove from wishlist:', error);
       throw error;
@@ -4,3 +4,14 @@ import { twMerge } from "tailwind-merge"
 export function cn(...inputs) {
   return twMerge(clsx(inputs));
 }
+
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL || "";
+
+// Uploaded images are served by the backend under /api/images
+export function assetUrl(url) {
+  return url && url.startsWith("/api/") ? `${BACKEND_URL}${url}` : url;
+}
+
+export function assetSrcSet(srcset) {
+  return srcset ? srcset.replace(/(^|,\s*)\/api\//g, `$1${BACKEND_URL}/api/`) : undefined;
+}
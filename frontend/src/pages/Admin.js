@@ -1,10 +1,11 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { Plus, Edit, Trash2, Users, ShoppingBag, Mail } from 'lucide-react';
 import axios from 'axios';
 import { Button } from '../components/ui/button';
 import { useAuth } from '../contexts/AuthContext';
 import { toast } from 'sonner';
+import { assetUrl, assetSrcSet } from '../lib/utils';
 import {
   Dialog,
   DialogContent,
@@ -14,6 +15,14 @@ import {
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
+const ENQUIRY_STATUSES = ['pending', 'in_progress', 'resolved', 'closed'];
+const ENQUIRY_STATUS_STYLES = {
+  pending: 'bg-yellow-100 text-yellow-800',
+  in_progress: 'bg-blue-100 text-blue-800',
+  resolved: 'bg-green-100 text-green-800',
+  closed: 'bg-gray-100 text-gray-800',
+};
+
 const Admin = () => {
   const { user } = useAuth();
   const navigate = useNavigate();
@@ -22,6 +31,11 @@ const Admin = () => {
   const [products, setProducts] = useState([]);
   const [users, setUsers] = useState([]);
   const [enquiries, setEnquiries] = useState([]);
+  const [enquiryStatusFilter, setEnquiryStatusFilter] = useState('');
+  const [enquiryCursor, setEnquiryCursor] = useState(null);
+  const [selectedEnquiries, setSelectedEnquiries] = useState([]);
+  // Read by the long-lived event stream handlers, which would otherwise see a stale filter
+  const enquiryFilterRef = useRef('');
   const [loading, setLoading] = useState(true);
   const [showProductModal, setShowProductModal] = useState(false);
   const [editingProduct, setEditingProduct] = useState(null);
@@ -44,9 +58,85 @@ const Admin = () => {
     fetchStats();
     fetchProducts();
     fetchUsers();
-    fetchEnquiries();
   }, [user, navigate]);
 
+  useEffect(() => {
+    if (user?.role !== 'admin') return;
+    enquiryFilterRef.current = enquiryStatusFilter;
+    setSelectedEnquiries([]);
+    fetchEnquiries();
+  }, [user, enquiryStatusFilter]);
+
+  useEffect(() => {
+    if (user?.role !== 'admin') return;
+    let source = null;
+    let retryTimer = null;
+    let closed = false;
+
+    // The stream token lives for a minute, so every (re)connect asks for a fresh one
+    // instead of putting the long-lived login token in the URL.
+    const connect = async (reconnecting) => {
+      let token;
+      try {
+        token = (await axios.post(`${API}/admin/events/token`)).data.token;
+      } catch (error) {
+        console.error('Failed to open admin event stream:', error);
+      }
+      if (closed) return;
+      if (!token) {
+        retryTimer = setTimeout(() => connect(reconnecting), 5000);
+        return;
+      }
+      source = new EventSource(`${API}/admin/events?token=${encodeURIComponent(token)}`);
+      if (reconnecting) {
+        // Events sent while disconnected are gone; reload what they would have changed
+        fetchStats();
+        fetchEnquiries();
+      }
+
+      source.addEventListener('enquiry', (event) => {
+        const enquiry = JSON.parse(event.data);
+        if (enquiryFilterRef.current && enquiryFilterRef.current !== enquiry.status) return;
+        setEnquiries(prev => [enquiry, ...prev.filter(e => e.id !== enquiry.id)]);
+      });
+
+      source.addEventListener('enquiry_status', () => {
+        fetchEnquiries();
+      });
+
+      source.addEventListener('stats', (event) => {
+        const delta = JSON.parse(event.data);
+        setStats(prev => {
+          if (!prev) return prev;
+          const next = { ...prev };
+          Object.entries(delta).forEach(([key, value]) => {
+            next[key] = (next[key] || 0) + value;
+          });
+          return next;
+        });
+      });
+
+      source.addEventListener('resync', () => {
+        fetchStats();
+        fetchEnquiries();
+      });
+
+      source.onerror = () => {
+        // The browser would retry with the same, soon expired, token
+        source.close();
+        if (!closed) retryTimer = setTimeout(() => connect(true), 3000);
+      };
+    };
+
+    connect(false);
+
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      if (source) source.close();
+    };
+  }, [user]);
+
   const fetchStats = async () => {
     try {
       const response = await axios.get(`${API}/admin/stats`);
@@ -76,15 +166,34 @@ const Admin = () => {
     }
   };
 
-  const fetchEnquiries = async () => {
+  const fetchEnquiries = async (cursor = null) => {
     try {
-      const response = await axios.get(`${API}/admin/enquiries`);
-      setEnquiries(response.data);
+      const response = await axios.get(`${API}/admin/enquiries`, {
+        params: { status: enquiryFilterRef.current || undefined, cursor: cursor || undefined }
+      });
+      setEnquiries(prev => (cursor ? [...prev, ...response.data] : response.data));
+      setEnquiryCursor(response.headers['x-next-cursor'] || null);
     } catch (error) {
       console.error('Failed to fetch enquiries:', error);
     }
   };
 
+  const toggleEnquirySelection = (id) => {
+    setSelectedEnquiries(prev => (prev.includes(id) ? prev.filter(e => e !== id) : [...prev, id]));
+  };
+
+  const handleEnquiryStatus = async (status) => {
+    try {
+      const response = await axios.post(`${API}/admin/enquiries/status`, { ids: selectedEnquiries, status });
+      const { updated, skipped } = response.data;
+      toast.success(`${updated} ${updated === 1 ? 'enquiry' : 'enquiries'} updated${skipped ? `, ${skipped} skipped` : ''}`);
+      setSelectedEnquiries([]);
+      fetchEnquiries();
+    } catch (error) {
+      toast.error('Failed to update enquiries');
+    }
+  };
+
   const handleAddProduct = () => {
     setEditingProduct(null);
     setProductForm({
@@ -143,6 +252,26 @@ const Admin = () => {
     }
   };
 
+  const handleImageUpload = async (e) => {
+    const file = e.target.files[0];
+    if (!file) return;
+    try {
+      const formData = new FormData();
+      formData.append('file', file);
+      const response = await axios.post(`${API}/admin/images`, formData);
+      setProductForm(prev => ({
+        ...prev,
+        images: prev.images ? `${prev.images}, ${response.data.url}` : response.data.url
+      }));
+      toast.success('Image uploaded');
+    } catch (error) {
+      console.error('Failed to upload image:', error);
+      toast.error('Failed to upload image');
+    } finally {
+      e.target.value = '';
+    }
+  };
+
   const handleDeleteProduct = async (productId) => {
     if (!window.confirm('Are you sure you want to delete this product?')) return;
     
@@ -260,7 +389,13 @@ const Admin = () => {
               {products.map((product) => (
                 <div key={product.id} className="flex gap-6 p-6 border border-border" data-testid={`product-row-${product.id}`}>
                   <div className="w-24 h-32 overflow-hidden bg-secondary/20 flex-shrink-0">
-                    <img src={product.images[0]} alt={product.name} className="w-full h-full object-cover" />
+                    <img
+                      src={assetUrl(product.images[0])}
+                      srcSet={assetSrcSet(product.image_srcset?.[0])}
+                      sizes="96px"
+                      alt={product.name}
+                      className="w-full h-full object-cover"
+                    />
                   </div>
                   <div className="flex-1">
                     <h3 className="text-lg font-serif mb-1">{product.name}</h3>
@@ -324,20 +459,59 @@ const Admin = () => {
 
         {activeTab === 'enquiries' && (
           <div data-testid="enquiries-section">
-            <h2 className="text-2xl font-serif mb-6">Customer Enquiries</h2>
+            <div className="flex flex-col md:flex-row md:items-center md:justify-between gap-4 mb-6">
+              <h2 className="text-2xl font-serif">Customer Enquiries</h2>
+              <div className="flex flex-wrap gap-2" data-testid="enquiry-status-filter">
+                {['', ...ENQUIRY_STATUSES].map(status => (
+                  <Button
+                    key={status || 'all'}
+                    variant={enquiryStatusFilter === status ? 'default' : 'outline'}
+                    className="h-9 rounded-none uppercase tracking-widest text-xs"
+                    onClick={() => setEnquiryStatusFilter(status)}
+                  >
+                    {status ? status.replace('_', ' ') : 'All'}
+                  </Button>
+                ))}
+              </div>
+            </div>
+            {selectedEnquiries.length > 0 && (
+              <div className="flex flex-wrap items-center gap-2 mb-4 p-4 bg-secondary/20" data-testid="enquiry-bulk-actions">
+                <span className="text-sm mr-2">{selectedEnquiries.length} selected</span>
+                {ENQUIRY_STATUSES.map(status => (
+                  <Button
+                    key={status}
+                    variant="outline"
+                    className="h-9 rounded-none uppercase tracking-widest text-xs"
+                    onClick={() => handleEnquiryStatus(status)}
+                    data-testid={`enquiry-mark-${status}`}
+                  >
+                    Mark {status.replace('_', ' ')}
+                  </Button>
+                ))}
+              </div>
+            )}
             <div className="space-y-4">
               {enquiries.map((enquiry) => (
                 <div key={enquiry.id} className="p-6 border border-border" data-testid={`enquiry-row-${enquiry.id}`}>
                   <div className="flex justify-between items-start mb-3">
-                    <div>
-                      <h3 className="text-lg font-serif mb-1">{enquiry.user_name}</h3>
-                      <p className="text-sm text-muted-foreground">{enquiry.user_email}</p>
+                    <div className="flex gap-4">
+                      <input
+                        type="checkbox"
+                        checked={selectedEnquiries.includes(enquiry.id)}
+                        onChange={() => toggleEnquirySelection(enquiry.id)}
+                        className="mt-2"
+                        data-testid={`enquiry-select-${enquiry.id}`}
+                      />
+                      <div>
+                        <h3 className="text-lg font-serif mb-1">{enquiry.user_name}</h3>
+                        <p className="text-sm text-muted-foreground">{enquiry.user_email}</p>
+                      </div>
                     </div>
                     <div>
                       <span className={`inline-block px-3 py-1 text-xs uppercase tracking-widest ${
-                        enquiry.status === 'pending' ? 'bg-yellow-100 text-yellow-800' : 'bg-green-100 text-green-800'
+                        ENQUIRY_STATUS_STYLES[enquiry.status] || ENQUIRY_STATUS_STYLES.resolved
                       }`}>
-                        {enquiry.status}
+                        {enquiry.status.replace('_', ' ')}
                       </span>
                     </div>
                   </div>
@@ -354,6 +528,18 @@ const Admin = () => {
                 </div>
               ))}
             </div>
+            {enquiryCursor && (
+              <div className="text-center mt-8">
+                <Button
+                  variant="outline"
+                  className="h-12 px-8 rounded-none uppercase tracking-widest text-xs"
+                  onClick={() => fetchEnquiries(enquiryCursor)}
+                  data-testid="enquiries-load-more"
+                >
+                  Load More
+                </Button>
+              </div>
+            )}
           </div>
         )}
       </div>
@@ -436,6 +622,13 @@ const Admin = () => {
                 className="w-full h-10 px-3 border border-border bg-transparent focus:outline-none focus:border-primary"
                 data-testid="product-images-input"
               />
+              <input
+                type="file"
+                accept="image/*"
+                onChange={handleImageUpload}
+                className="mt-2 text-xs"
+                data-testid="product-image-upload"
+              />
             </div>
             <div className="flex items-center space-x-2">
               <input
@@ -4,6 +4,7 @@ import { Trash2, Plus, Minus } from 'lucide-react';
 import { useCart } from '../contexts/CartContext';
 import { Button } from '../components/ui/button';
 import { toast } from 'sonner';
+import { assetUrl, assetSrcSet } from '../lib/utils';
 import { Link, useNavigate } from 'react-router-dom';
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
@@ -96,7 +97,13 @@ const Cart = () => {
                 return (
                   <div key={`${item.product_id}-${item.size}-${index}`} className="flex gap-6 p-6 border border-border" data-testid={`cart-item-${item.product_id}`}>
                     <Link to={`/products/${product.id}`} className="w-32 h-40 overflow-hidden bg-secondary/20 flex-shrink-0">
-                      <img src={product.images[0]} alt={product.name} className="w-full h-full object-cover" />
+                      <img
+                        src={assetUrl(product.images[0])}
+                        srcSet={assetSrcSet(product.image_srcset?.[0])}
+                        sizes="128px"
+                        alt={product.name}
+                        className="w-full h-full object-cover"
+                      />
                     </Link>
                     <div className="flex-1">
                       <Link to={`/products/${product.id}`}>
@@ -2,6 +2,7 @@ import React, { useEffect, useState } from 'react';
 import { Link } from 'react-router-dom';
 import { ChevronRight } from 'lucide-react';
 import axios from 'axios';
+import { assetUrl } from '../lib/utils';
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
@@ -55,7 +56,7 @@ const Collections = () => {
                 data-testid={`collection-card-${collection.id}`}
               >
                 <img
-                  src={collection.image}
+                  src={assetUrl(collection.image)}
                   alt={collection.name}
                   className="w-full h-full object-cover transition-transform duration-700 group-hover:scale-105"
                 />
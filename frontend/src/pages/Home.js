@@ -3,7 +3,8 @@ import { Link } from 'react-router-dom';
 import { ChevronRight } from 'lucide-react';
 import axios from 'axios';
 import { Button } from '../components/ui/button';
-import ProductCard from '../components/ProductCard';
+import ProductCard, { CARD_FIELDS } from '../components/ProductCard';
+import { assetUrl } from '../lib/utils';
 import { useInView } from 'react-intersection-observer';
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
@@ -21,8 +22,8 @@ const Home = () => {
 
   const fetchProducts = async () => {
     try {
-      const response = await axios.get(`${API}/products`);
-      setProducts(response.data.slice(0, 4));
+      const response = await axios.get(`${API}/products`, { params: { fields: CARD_FIELDS, limit: 4 } });
+      setProducts(response.data);
     } catch (error) {
       console.error('Failed to fetch products:', error);
     }
@@ -83,7 +84,7 @@ const Home = () => {
                   data-testid={`collection-card-${collection.id}`}
                 >
                   <img
-                    src={collection.image}
+                    src={assetUrl(collection.image)}
                     alt={collection.name}
                     className="w-full h-full object-cover transition-transform duration-700 group-hover:scale-105"
                   />
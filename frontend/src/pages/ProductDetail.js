@@ -6,6 +6,7 @@ import { Button } from '../components/ui/button';
 import { useCart } from '../contexts/CartContext';
 import { useAuth } from '../contexts/AuthContext';
 import { toast } from 'sonner';
+import { assetUrl, assetSrcSet } from '../lib/utils';
 import ProductCard from '../components/ProductCard';
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
@@ -43,19 +44,14 @@ const ProductDetail = () => {
 
   const fetchSuggestedProducts = async () => {
     try {
-      const response = await axios.get(`${API}/products`);
-      setSuggestedProducts(response.data.filter(p => p.id !== id).slice(0, 4));
+      const response = await axios.get(`${API}/products/${id}/related?limit=4`);
+      setSuggestedProducts(response.data);
     } catch (error) {
       console.error('Failed to fetch suggested products:', error);
     }
   };
 
   const handleAddToCart = async () => {
-    if (!isAuthenticated) {
-      toast.error('Please login to add items to cart');
-      navigate('/login');
-      return;
-    }
     if (!selectedSize) {
       toast.error('Please select a size');
       return;
@@ -69,11 +65,6 @@ const ProductDetail = () => {
   };
 
   const handleWishlistToggle = async () => {
-    if (!isAuthenticated) {
-      toast.error('Please login to add items to wishlist');
-      navigate('/login');
-      return;
-    }
     try {
       if (isInWishlist(product.id)) {
         await removeFromWishlist(product.id);
@@ -116,7 +107,9 @@ const ProductDetail = () => {
           <div className="space-y-4">
             <div className="aspect-[3/4] overflow-hidden bg-secondary/20" data-testid="product-main-image">
               <img
-                src={product.images[0]}
+                src={assetUrl(product.images[0])}
+                srcSet={assetSrcSet(product.image_srcset?.[0])}
+                sizes="(min-width: 768px) 50vw, 100vw"
                 alt={product.name}
                 className="w-full h-full object-cover"
               />
@@ -125,7 +118,14 @@ const ProductDetail = () => {
               <div className="grid grid-cols-4 gap-4">
                 {product.images.slice(1).map((image, index) => (
                   <div key={index} className="aspect-square overflow-hidden bg-secondary/20">
-                    <img src={image} alt={`${product.name} ${index + 2}`} className="w-full h-full object-cover" />
+                    <img
+                      src={assetUrl(image)}
+                      srcSet={assetSrcSet(product.image_srcset?.[index + 1])}
+                      sizes="(min-width: 768px) 12vw, 25vw"
+                      loading="lazy"
+                      alt={`${product.name} ${index + 2}`}
+                      className="w-full h-full object-cover"
+                    />
                   </div>
                 ))}
               </div>
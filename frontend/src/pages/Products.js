@@ -1,7 +1,7 @@
 import React, { useEffect, useState } from 'react';
 import { Search, SlidersHorizontal } from 'lucide-react';
 import axios from 'axios';
-import ProductCard from '../components/ProductCard';
+import ProductCard, { CARD_FIELDS } from '../components/ProductCard';
 import { Button } from '../components/ui/button';
 import {
   Select,
@@ -26,13 +26,20 @@ const Products = () => {
     availability: ''
   });
   const [showFilters, setShowFilters] = useState(false);
+  const [sort, setSort] = useState('');
 
   const categories = ['Shirts', 'Jackets', 'Dresses', 'Sweaters', 'Coats', 'Pants'];
   const sizes = ['XS', 'S', 'M', 'L', 'XL'];
+  const sortOptions = [
+    { value: 'newest', label: 'Newest' },
+    { value: 'price_asc', label: 'Price: Low to High' },
+    { value: 'price_desc', label: 'Price: High to Low' },
+    { value: 'name', label: 'Name' },
+  ];
 
   useEffect(() => {
     fetchProducts();
-  }, []);
+  }, [sort]);
 
   useEffect(() => {
     applyFilters();
@@ -40,7 +47,9 @@ const Products = () => {
 
   const fetchProducts = async () => {
     try {
-      const response = await axios.get(`${API}/products`);
+      const response = await axios.get(`${API}/products`, {
+        params: { fields: `${CARD_FIELDS},sizes`, sort: sort || undefined }
+      });
       setProducts(response.data);
       setFilteredProducts(response.data);
     } catch (error) {
@@ -127,6 +136,17 @@ const Products = () => {
                 data-testid="search-input"
               />
             </div>
+            <Select value={sort} onValueChange={(value) => setSort(value.trim())}>
+              <SelectTrigger className="h-12 md:w-56 rounded-none" data-testid="sort-select">
+                <SelectValue placeholder="Sort: Featured" />
+              </SelectTrigger>
+              <SelectContent>
+                <SelectItem value=" ">Featured</SelectItem>
+                {sortOptions.map(option => (
+                  <SelectItem key={option.value} value={option.value}>{option.label}</SelectItem>
+                ))}
+              </SelectContent>
+            </Select>
             <Button
               variant="outline"
               className="h-12 px-6 rounded-none uppercase tracking-widest text-xs"
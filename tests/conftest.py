@@ -0,0 +1,95 @@
+import asyncio
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+
+def plan_nodes(plan):
+    """Every node in an explain plan tree."""
+    nodes = [plan]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            nodes += plan_nodes(plan[key])
+    for child in plan.get("inputStages", []):
+        nodes += plan_nodes(child)
+    return nodes
+
+
+def plan_stages(plan):
+    """Every stage name in an explain plan tree."""
+    return [node["stage"] for node in plan_nodes(plan)]
+
+
+@pytest.fixture
+def explain_stages():
+    """Stage names of a cursor's winning plan, for asserting index use."""
+    async def stages(cursor):
+        explain = await cursor.explain()
+        return plan_stages(explain["queryPlanner"]["winningPlan"])
+
+    return stages
+
+
+@pytest.fixture
+def explain_indexes():
+    """Key fields of every index a cursor's winning plan scans."""
+    async def indexes(cursor):
+        explain = await cursor.explain()
+        return [list(node["keyPattern"]) for node in plan_nodes(explain["queryPlanner"]["winningPlan"])
+                if node["stage"] == "IXSCAN"]
+
+    return indexes
+
+
+@pytest.fixture
+def mongo_url():
+    if "MONGO_URL" not in os.environ:
+        pytest.skip("requires a MongoDB instance in MONGO_URL")
+    return os.environ["MONGO_URL"]
+
+
+@pytest.fixture
+def run_with_db(mongo_url):
+    """Run ``scenario(db)`` against a throwaway database that is dropped afterwards."""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    def run(scenario):
+        client = AsyncIOMotorClient(mongo_url)
+        db_name = f"luxe_test_{uuid.uuid4().hex[:8]}"
+
+        async def main():
+            try:
+                await scenario(client[db_name])
+            finally:
+                await client.drop_database(db_name)
+                client.close()
+
+        asyncio.run(main())
+
+    return run
+
+
+@pytest.fixture
+def run_with_server(run_with_db):
+    """Run ``scenario(server)`` with the server module pointed at a throwaway database."""
+    os.environ.setdefault("DB_NAME", "luxe_test")
+    import server
+
+    def run(scenario):
+        async def with_server(db):
+            # Repoint rather than replace, so registered job handlers and cache subscriptions stay
+            saved = server.db, server.job_queue.db, server.invalidation_bus.db
+            server.db = server.job_queue.db = server.invalidation_bus.db = db
+            try:
+                await scenario(server)
+            finally:
+                server.db, server.job_queue.db, server.invalidation_bus.db = saved
+
+        run_with_db(with_server)
+
+    return run
@@ -0,0 +1,146 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+WORKERS = 4
+MAX_DELIVERY_SECONDS = 2.0
+
+
+class Worker:
+    """One simulated uvicorn worker: its own client, cache and bus."""
+
+    def __init__(self, db_name, **bus_options):
+        from motor.motor_asyncio import AsyncIOMotorClient
+        from caching import EntityCache, InvalidationBus
+
+        self.client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+        self.cache = EntityCache()
+        self.bus = InvalidationBus(self.client[db_name], **bus_options)
+        self.bus.subscribe(self.cache.invalidate, on_flush=self.cache.clear)
+        self.task = None
+
+    async def start(self):
+        self.task = asyncio.create_task(self.bus.run())
+        while self.bus.last_seq is None:
+            await asyncio.sleep(0.01)
+
+    async def stop(self):
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+
+
+async def wait_for(predicate, timeout):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def run_with_workers(run_with_db):
+    def run(count, scenario, **bus_options):
+        async def main(db):
+            workers = [Worker(db.name, **bus_options) for _ in range(count)]
+            try:
+                for worker in workers:
+                    await worker.start()
+                await scenario(workers)
+            finally:
+                for worker in workers:
+                    if worker.task:
+                        await worker.stop()
+                    worker.client.close()
+
+        run_with_db(main)
+
+    return run
+
+
+def test_invalidation_reaches_every_worker_within_bound(run_with_workers):
+    async def scenario(workers):
+        for worker in workers:
+            worker.cache.set("product", "p1", {"name": "cached"})
+
+        started = time.monotonic()
+        await workers[0].bus.publish("product", "p1")
+        delivered = await wait_for(
+            lambda: all(w.cache.get("product", "p1") is None for w in workers),
+            MAX_DELIVERY_SECONDS
+        )
+
+        assert delivered, f"not delivered within {MAX_DELIVERY_SECONDS}s"
+        assert time.monotonic() - started < MAX_DELIVERY_SECONDS
+        for worker in workers[1:]:
+            assert worker.bus.metrics()["applied"] == 1
+            assert worker.bus.metrics()["lag_max"] < MAX_DELIVERY_SECONDS
+
+    run_with_workers(WORKERS, scenario)
+
+
+def test_worker_that_missed_rolled_over_events_flushes_its_cache(run_with_workers):
+    async def scenario(workers):
+        publisher, lagging = workers
+        await lagging.stop()
+        lagging.cache.set("collection", "c1", {"name": "stale"})
+
+        # Overflow the capped collection while the lagging worker is away
+        for i in range(30):
+            await publisher.bus.publish("product", f"p{i}")
+
+        await lagging.start()
+        recovered = await wait_for(lambda: lagging.bus.metrics()["recoveries"] == 1, MAX_DELIVERY_SECONDS)
+
+        assert recovered
+        assert lagging.cache.get("collection", "c1") is None
+
+    run_with_workers(2, scenario, max_events=10)
+
+
+def test_events_published_during_a_cursor_restart_are_not_lost(run_with_workers):
+    async def scenario(workers):
+        publisher, restarting = workers
+        await restarting.stop()
+        restarting.cache.set("product", "p1", {"name": "stale"})
+
+        await publisher.bus.publish("product", "p1")
+        await restarting.start()
+
+        assert await wait_for(lambda: restarting.cache.get("product", "p1") is None, MAX_DELIVERY_SECONDS)
+        assert restarting.bus.metrics()["recoveries"] == 0
+
+    run_with_workers(2, scenario)
+
+
+def test_entries_loaded_before_an_invalidation_are_not_cached():
+    from caching import EntityCache
+
+    cache = EntityCache()
+    version = cache.version
+    # An update publishes its invalidation while the read is still in flight
+    cache.invalidate("product", "p1")
+    cache.set("product", "p1", {"name": "stale"}, version=version)
+    assert cache.get("product", "p1") is None
+
+    version = cache.version
+    cache.set("product", "p1", {"name": "fresh"}, version=version)
+    assert cache.get("product", "p1") == {"name": "fresh"}
+
+
+def test_losing_the_capped_collection_creation_race_is_not_an_error():
+    from pymongo.errors import OperationFailure
+    from caching import InvalidationBus
+
+    class RacingDb:
+        def __init__(self, code):
+            self.code = code
+
+        async def create_collection(self, name, **options):
+            raise OperationFailure("collection already exists", code=self.code)
+
+    asyncio.run(InvalidationBus(RacingDb(48)).ensure_collection())
+    with pytest.raises(OperationFailure):
+        asyncio.run(InvalidationBus(RacingDb(13)).ensure_collection())
@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def run_with_catalog(run_with_server):
+    def run(scenario):
+        async def seeded(server):
+            await server.db.products.insert_many([
+                {"id": f"p{n}", "name": f"Product {n}", "sizes": ["S", "M"]} for n in range(1, 12)
+            ])
+            await scenario(server)
+
+        run_with_server(seeded)
+
+    return run
+
+
+def batch(*operations):
+    from server import CartBatch
+
+    return CartBatch(operations=[dict(zip(("target", "action", "product_id", "size", "quantity"), op))
+                                 for op in operations])
+
+
+def test_overlapping_batches_do_not_lose_updates(run_with_catalog):
+    async def scenario(server):
+        user = server.User(id="u1", email="u1@example.com", name="U")
+        await asyncio.gather(*[
+            server.apply_cart_batch(batch(("cart", "add", "p1", "M", 1), ("cart", "add", f"p{n}", "S", 1),
+                                          ("wishlist", "add", f"p{n}")), user)
+            for n in range(2, 12)
+        ])
+
+        result = await server.apply_cart_batch(batch(), user)
+        lines = {(i["product_id"], i["size"]): i["quantity"] for i in result["cart"]["items"]}
+        assert lines[("p1", "M")] == 10
+        assert len(lines) == 11
+        assert sorted(result["wishlist"]) == sorted(f"p{n}" for n in range(2, 12))
+        assert await server.db.carts.count_documents({}) == 1
+
+    run_with_catalog(scenario)
+
+
+def test_first_batches_racing_to_create_the_docs_all_apply(run_with_catalog):
+    async def scenario(server):
+        await server.ensure_indexes()
+        user = server.User(id="u1", email="u1@example.com", name="U")
+        await asyncio.gather(*[
+            server.apply_cart_batch(batch(("cart", "add", "p1", "M", 1), ("wishlist", "add", f"p{n}")), user)
+            for n in range(2, 12)
+        ])
+
+        cart = await server.db.carts.find_one({"user_id": "u1"})
+        wishlist = await server.db.wishlists.find_one({"user_id": "u1"})
+        assert cart["items"] == [{"product_id": "p1", "size": "M", "quantity": 10}]
+        assert sorted(wishlist["product_ids"]) == sorted(f"p{n}" for n in range(2, 12))
+        assert await server.db.carts.count_documents({}) == await server.db.wishlists.count_documents({}) == 1
+
+    run_with_catalog(scenario)
+
+
+def test_duplicate_docs_are_merged_before_user_id_becomes_unique(run_with_catalog):
+    async def scenario(server):
+        await server.db.carts.create_index("user_id")
+        await server.db.carts.insert_many([
+            {"user_id": "u1", "items": [{"product_id": "p1", "size": "M", "quantity": 1}]},
+            {"user_id": "u1", "items": [{"product_id": "p1", "size": "M", "quantity": 2},
+                                        {"product_id": "p2", "size": "S", "quantity": 1}]},
+            {"user_id": "u2", "items": []},
+        ])
+        await server.db.wishlists.insert_many([
+            {"user_id": "u1", "product_ids": ["p1", "p2"]},
+            {"user_id": "u1", "product_ids": ["p2", "p3"]},
+        ])
+
+        await server.ensure_indexes()
+
+        cart = await server.db.carts.find_one({"user_id": "u1"})
+        assert cart["items"] == [{"product_id": "p1", "size": "M", "quantity": 3},
+                                 {"product_id": "p2", "size": "S", "quantity": 1}]
+        assert await server.db.carts.count_documents({}) == 2
+        wishlists = await server.db.wishlists.find({"user_id": "u1"}).to_list(None)
+        assert [w["product_ids"] for w in wishlists] == [["p1", "p2", "p3"]]
+        assert (await server.db.carts.index_information())["user_id_1"]["unique"]
+
+    run_with_catalog(scenario)
+
+
+def test_update_to_zero_removes_the_line(run_with_catalog):
+    async def scenario(server):
+        user = server.User(id="u1", email="u1@example.com", name="U")
+        await server.apply_cart_batch(batch(("cart", "add", "p1", "M", 2), ("cart", "add", "p2", "M", 1)), user)
+        result = await server.apply_cart_batch(batch(("cart", "update", "p1", "M", 0),
+                                                     ("cart", "update", "p2", "M", 5)), user)
+        assert result["cart"]["items"] == [{"product_id": "p2", "size": "M", "quantity": 5}]
+
+    run_with_catalog(scenario)
+
+
+def test_adds_must_be_positive():
+    from pydantic import ValidationError
+
+    with pytest.raises(ValidationError):
+        batch(("cart", "add", "p1", "M", -3))
+    with pytest.raises(ValidationError):
+        batch(("cart", "add", "p1", "M", 0))
+
+
+def test_adds_of_unknown_products_or_sizes_are_rejected(run_with_catalog):
+    from fastapi import HTTPException
+
+    async def scenario(server):
+        user = server.User(id="u1", email="u1@example.com", name="U")
+        for operation in (("cart", "add", "missing", "M", 1), ("cart", "add", "p1", "XXL", 1),
+                          ("cart", "add", "$$x", "M", 1), ("wishlist", "add", "missing")):
+            with pytest.raises(HTTPException) as error:
+                await server.apply_cart_batch(batch(operation), user)
+            assert error.value.status_code == 400
+        assert await server.db.carts.count_documents({}) == 0
+
+    run_with_catalog(scenario)
+
+
+def test_guest_cart_values_are_merged_literally(run_with_catalog):
+    async def scenario(server):
+        await server.db.carts.insert_one({"user_id": "u1", "items": [{"product_id": "p1", "size": "M", "quantity": 1}]})
+        token = server.encode_guest_cart([{"product_id": "$$x", "size": "$size", "quantity": 2},
+                                          {"product_id": "p1", "size": "M", "quantity": 1}], [])
+
+        await server.merge_guest_cart("u1", token)
+
+        cart = await server.db.carts.find_one({"user_id": "u1"})
+        assert cart["items"] == [{"product_id": "p1", "size": "M", "quantity": 2},
+                                 {"product_id": "$$x", "size": "$size", "quantity": 2}]
+
+    run_with_catalog(scenario)
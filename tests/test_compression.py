@@ -0,0 +1,111 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+import compression
+from compression import CompressionMiddleware, negotiate_encoding
+
+BODY = json.dumps([{"id": i, "name": f"Product {i}", "category": "Shirts"} for i in range(200)]).encode()
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", "br"),
+    ("br;q=0.1, gzip;q=1", "gzip"),
+    ("gzip;q=0.5, br;q=0.5", "br"),
+    ("GZIP; Q=0.3", "gzip"),
+    ("gzip;q=0.5, *;q=0.8", "br"),
+    ("br;q=0, gzip;q=0", None),
+    ("*;q=0", None),
+    ("identity", None),
+    ("", None),
+])
+def test_negotiation_picks_the_highest_q_value(header, expected):
+    if compression.brotli is None and expected == "br":
+        pytest.skip("brotli is not installed")
+    assert negotiate_encoding(header) == expected
+
+
+def test_negotiation_without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert negotiate_encoding("br") is None
+    assert negotiate_encoding("br, gzip;q=0.1") == "gzip"
+
+
+class App:
+    def __init__(self, body=BODY, content_type=b"application/json"):
+        self.body = body
+        self.content_type = content_type
+        self.calls = 0
+        self.during = None
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        if self.during:
+            self.during()
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", self.content_type), (b"content-length", str(len(self.body)).encode())]})
+        await send({"type": "http.response.body", "body": self.body})
+
+
+def request(middleware, path="/api/products", accept=b"gzip"):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": b"",
+             "headers": [(b"accept-encoding", accept)]}
+    asyncio.run(middleware(scope, receive, send))
+    return dict(messages[0]["headers"]), b"".join(m.get("body", b"") for m in messages[1:])
+
+
+def test_large_bodies_are_compressed_and_small_ones_are_not():
+    headers, body = request(CompressionMiddleware(App(), minimum_size=1024))
+    assert headers[b"content-encoding"] == b"gzip"
+    assert headers[b"vary"] == b"Accept-Encoding"
+    assert int(headers[b"content-length"]) == len(body)
+    assert gzip.decompress(body) == BODY
+
+    headers, body = request(CompressionMiddleware(App(b'{"ok": true}'), minimum_size=1024))
+    assert b"content-encoding" not in headers
+    assert body == b'{"ok": true}'
+
+    headers, body = request(CompressionMiddleware(App(), minimum_size=1024), accept=b"identity")
+    assert b"content-encoding" not in headers
+    assert body == BODY
+
+
+def test_event_streams_and_binary_bodies_pass_through():
+    for content_type in (b"text/event-stream", b"image/webp"):
+        headers, body = request(CompressionMiddleware(App(content_type=content_type), minimum_size=0))
+        assert b"content-encoding" not in headers
+        assert body == BODY
+
+
+def test_cacheable_bodies_are_reused_until_the_version_changes():
+    version = [1]
+    app = App()
+    middleware = CompressionMiddleware(app, cacheable=lambda scope: True, cache_version=lambda: version[0])
+
+    first = request(middleware)
+    second = request(middleware)
+    assert app.calls == 1
+    assert second == first
+    assert middleware.stats.cache_hits == 1
+
+    version[0] = 2
+    request(middleware)
+    assert app.calls == 2
+
+    # A write landing while the handler runs must not cache the old body at the new version
+    version[0] = 3
+    app.during = lambda: version.__setitem__(0, 4)
+    request(middleware)
+    app.during = None
+    request(middleware)
+    assert app.calls == 4
@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+
+from concurrency import ConcurrencyLimit, ConcurrencyLimitMiddleware, LimitExceeded, parse_limits
+
+
+def test_parse_limits():
+    limits = parse_limits("auth=4:16:2.5, search = 8:32:1 ,")
+
+    assert sorted(limits) == ["auth", "search"]
+    auth = limits["auth"]
+    assert (auth.max_concurrent, auth.max_queue, auth.queue_timeout, auth.retry_after) == (4, 16, 2.5, 3)
+
+
+def test_waiters_are_admitted_in_order_as_slots_free_up():
+    async def main():
+        limit = ConcurrencyLimit("test", max_concurrent=1, max_queue=2, queue_timeout=1)
+        await limit.acquire()
+        admitted = []
+
+        async def wait(name):
+            await limit.acquire()
+            admitted.append(name)
+
+        waiters = [asyncio.create_task(wait("first")), asyncio.create_task(wait("second"))]
+        await asyncio.sleep(0)
+        with pytest.raises(LimitExceeded):
+            await limit.acquire()
+
+        limit.release()
+        await asyncio.sleep(0)
+        limit.release()
+        await asyncio.gather(*waiters)
+        limit.release()
+
+        assert admitted == ["first", "second"]
+        metrics = limit.metrics()
+        assert (metrics["active"], metrics["queued"], metrics["admitted"], metrics["shed_queue_full"]) == (0, 0, 3, 1)
+
+    asyncio.run(main())
+
+
+def test_queued_requests_time_out_or_leave_when_cancelled():
+    async def main():
+        limit = ConcurrencyLimit("test", max_concurrent=1, max_queue=4, queue_timeout=0.05)
+        await limit.acquire()
+        with pytest.raises(LimitExceeded):
+            await limit.acquire()
+        assert limit.shed_timeout == 1
+
+        # A client that disconnects while queued leaves no trace in the queue
+        waiter = asyncio.create_task(limit.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert len(limit.waiters) == 0
+        limit.release()
+        assert limit.active == 0
+
+    asyncio.run(main())
+
+
+def test_a_slot_handed_over_as_the_deadline_fires_is_not_leaked(monkeypatch):
+    async def main():
+        limit = ConcurrencyLimit("test", max_concurrent=1, max_queue=1, queue_timeout=1)
+        await limit.acquire()
+
+        async def release_then_time_out(waiter, timeout):
+            # The ordering asyncio.timeout can produce: release() resolves the waiter,
+            # then the deadline cancels the task before it resumes
+            limit.release()
+            raise asyncio.TimeoutError
+
+        monkeypatch.setattr(asyncio, "wait_for", release_then_time_out)
+        await limit.acquire()
+        monkeypatch.undo()
+
+        assert (limit.active, len(limit.waiters), limit.shed_timeout) == (1, 0, 0)
+        limit.release()
+        assert limit.active == 0
+
+    asyncio.run(main())
+
+
+def test_middleware_sheds_with_503_and_retry_after():
+    async def main():
+        release = asyncio.Event()
+
+        async def app(scope, receive, send):
+            await release.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        limits = {"search": ConcurrencyLimit("search", max_concurrent=1, max_queue=0, queue_timeout=1)}
+        middleware = ConcurrencyLimitMiddleware(app, limits, classify=lambda scope: scope["path"].strip("/") or None)
+
+        async def request(path):
+            messages = []
+
+            async def send(message):
+                messages.append(message)
+
+            async def receive():
+                return {"type": "http.request", "body": b""}
+
+            await middleware({"type": "http", "path": path, "method": "GET", "headers": []}, receive, send)
+            return messages[0]["status"], dict(messages[0]["headers"])
+
+        first = asyncio.create_task(request("/search"))
+        await asyncio.sleep(0)
+        shed_status, shed_headers = await request("/search")
+        release.set()
+        unlimited_status, _ = await request("/")
+
+        assert shed_status == 503
+        assert shed_headers[b"retry-after"] == b"1"
+        assert (await first)[0] == 200
+        assert unlimited_status == 200
+        assert limits["search"].active == 0
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("query, group", [
+    (b"search=silk", "search"),
+    (b"category=Shirts&search=silk%20tie", "search"),
+    (b"search=", None),
+    (b"research=silk", None),
+    (b"category=Shirts", None),
+])
+def test_only_non_empty_product_searches_are_limited(query, group):
+    from server import route_group
+
+    assert route_group({"path": "/api/products", "query_string": query}) == group
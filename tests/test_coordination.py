@@ -0,0 +1,90 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from coordination import _renew_lease, run_with_lease
+
+
+def test_exactly_one_concurrent_caller_runs_the_task(run_with_db):
+    async def scenario(db):
+        runs = []
+
+        async def task():
+            runs.append(1)
+            await asyncio.sleep(0.1)
+
+        results = await asyncio.gather(*[
+            run_with_lease(db.locks, "seed", 1, task, poll_interval=0.01, owner=f"w{n}") for n in range(5)
+        ])
+
+        assert sorted(results) == [False, False, False, False, True]
+        assert len(runs) == 1
+        state = await db.locks.find_one({"_id": "seed"})
+        assert (state["completed_version"], state["lease_expires_at"]) == (1, None)
+
+        # Once the version is recorded later workers skip it, and a newer version runs again
+        assert await run_with_lease(db.locks, "seed", 1, task) is False
+        assert await run_with_lease(db.locks, "seed", 2, task) is True
+        assert len(runs) == 2
+
+    run_with_db(scenario)
+
+
+def test_an_expired_lease_is_taken_over(run_with_db):
+    async def scenario(db):
+        await db.locks.insert_one({"_id": "seed", "owner": "crashed",
+                                   "lease_expires_at": datetime.now(timezone.utc) - timedelta(minutes=5)})
+        runs = []
+
+        async def task():
+            runs.append(1)
+
+        assert await run_with_lease(db.locks, "seed", 1, task, owner="w1") is True
+        assert len(runs) == 1
+        assert (await db.locks.find_one({"_id": "seed"}))["owner"] == "w1"
+
+    run_with_db(scenario)
+
+
+def test_a_failing_task_clears_the_lease(run_with_db):
+    async def scenario(db):
+        async def fail():
+            raise RuntimeError("seed failed")
+
+        with pytest.raises(RuntimeError):
+            await run_with_lease(db.locks, "seed", 1, fail, owner="w1")
+        state = await db.locks.find_one({"_id": "seed"})
+        assert state["lease_expires_at"] is None
+        assert "completed_version" not in state
+
+        async def succeed():
+            pass
+
+        # The next worker does not wait out the lease
+        assert await asyncio.wait_for(run_with_lease(db.locks, "seed", 1, succeed, owner="w2"), 1) is True
+
+    run_with_db(scenario)
+
+
+def test_renewal_survives_a_failed_update():
+    from pymongo.errors import AutoReconnect
+
+    class Locks:
+        def __init__(self):
+            self.calls = 0
+
+        async def update_one(self, query, update):
+            self.calls += 1
+            if self.calls == 1:
+                raise AutoReconnect("primary stepped down")
+
+    async def main():
+        locks = Locks()
+        renewal = asyncio.create_task(_renew_lease(locks, "seed", "w1", timedelta(seconds=0.03)))
+        await asyncio.sleep(0.1)
+        assert not renewal.done()
+        renewal.cancel()
+        assert locks.calls >= 2
+
+    asyncio.run(main())
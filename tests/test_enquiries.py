@@ -0,0 +1,112 @@
+import base64
+import json
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+ENQUIRIES = 300
+PAGE = 25
+STATUSES = ["pending", "in_progress", "resolved", "closed"]
+
+FILTERS = [
+    {},
+    {"status": "pending"},
+    {"product_id": "p1"},
+    {"status": "resolved", "product_id": "p2"},
+    {"created_after": datetime(2026, 1, 3, tzinfo=timezone.utc), "created_before": datetime(2026, 1, 6)},
+    {"status": "pending", "created_after": datetime(2026, 1, 2, tzinfo=timezone.utc)},
+]
+
+
+def sample_enquiry(i):
+    return {
+        "id": f"enquiry-{i:04d}",
+        "user_id": f"user-{i % 7}",
+        "product_id": f"p{i % 4}",
+        "message": "Is this available in M?",
+        "status": STATUSES[i % len(STATUSES)],
+        "user_name": "Customer",
+        "user_email": "customer@example.com",
+        # Many enquiries share a timestamp, so paging must break ties on id
+        "created_at": f"2026-01-{1 + i % 9:02d}T10:00:00+00:00",
+    }
+
+
+@pytest.fixture
+def run_with_enquiries(run_with_server):
+    def run(scenario):
+        async def seeded(server):
+            await server.ensure_indexes()
+            await server.db.enquiries.insert_many([sample_enquiry(i) for i in range(ENQUIRIES)])
+            await scenario(server)
+
+        run_with_server(seeded)
+
+    return run
+
+
+def test_keyset_pages_cover_every_match_once_in_order(run_with_enquiries):
+    async def scenario(server):
+        for filters in FILTERS:
+            expected = await server.db.enquiries.find(server.enquiry_query(**filters), {"_id": 0}).to_list(None)
+            expected.sort(key=lambda e: (e["created_at"], e["id"]), reverse=True)
+
+            seen, cursor = [], None
+            while True:
+                query = server.enquiry_query(**filters, cursor=cursor)
+                page = await server.find_enquiries(query, {"_id": 0}, PAGE).to_list(PAGE)
+                seen += page
+                if len(page) < PAGE:
+                    break
+                cursor = server.encode_enquiry_cursor(page[-1])
+
+            assert [e["id"] for e in seen] == [e["id"] for e in expected], filters
+
+    run_with_enquiries(scenario)
+
+
+def test_filtered_pages_use_an_index_without_a_sort_stage(run_with_enquiries, explain_stages, explain_indexes):
+    async def scenario(server):
+        cursor = server.encode_enquiry_cursor(sample_enquiry(ENQUIRIES // 2))
+        for filters in FILTERS:
+            # Every equality filter is a prefix of the scanned index, so no filter is applied by FETCH
+            expected = [field for field in ("status", "product_id") if field in filters] + ["created_at", "id"]
+            for page_cursor in (None, cursor):
+                query = server.enquiry_query(**filters, cursor=page_cursor)
+                stages = await explain_stages(server.find_enquiries(query, {"_id": 0}, PAGE))
+                assert "IXSCAN" in stages, (filters, stages)
+                assert "SORT" not in stages, (filters, stages)
+                indexes = await explain_indexes(server.find_enquiries(query, {"_id": 0}, PAGE))
+                assert {tuple(index) for index in indexes} == {tuple(expected)}, (filters, indexes)
+
+    run_with_enquiries(scenario)
+
+
+def test_bulk_transition_respects_allowed_transitions_and_counts_pending(run_with_enquiries):
+    async def scenario(server):
+        ids = [f"enquiry-{i:04d}" for i in range(8)] + ["missing"]
+
+        updated, pending_delta = await server.transition_enquiries(ids, "resolved")
+        # pending and in_progress may be resolved; resolved and closed may not
+        assert (updated, pending_delta) == (4, -2)
+
+        updated, pending_delta = await server.transition_enquiries(ids, "pending")
+        # in_progress and closed may go back to pending; resolved may not
+        assert (updated, pending_delta) == (2, 2)
+
+        statuses = {e["id"]: e["status"] async for e in server.db.enquiries.find({"id": {"$in": ids}})}
+        assert statuses["enquiry-0000"] == "resolved"
+        assert statuses["enquiry-0003"] == "pending"
+
+    run_with_enquiries(scenario)
+
+
+@pytest.mark.parametrize("parts", [[{"$gt": ""}, "enquiry-0001"], ["2026-01-01", {"$ne": None}], ["2026-01-01"], 5])
+def test_cursors_must_hold_two_strings(parts):
+    from server import decode_enquiry_cursor
+
+    cursor = base64.urlsafe_b64encode(json.dumps(parts).encode()).decode()
+    with pytest.raises(HTTPException) as error:
+        decode_enquiry_cursor(cursor)
+    assert error.value.status_code == 400
@@ -0,0 +1,33 @@
+import pytest
+from fastapi import HTTPException
+
+from fieldsets import FieldSelection, FieldSpec
+
+FIELDS = {name: FieldSpec(str, {name: 1}) for name in ("id", "name", "category", "description", "image")}
+
+
+def test_selections_are_normalised_to_allow_list_order():
+    selection = FieldSelection("product", FIELDS)
+
+    assert selection.parse("name,id") == selection.parse(" id , name,name,") == ("id", "name")
+    assert selection.parse(None) is None
+    with pytest.raises(HTTPException) as error:
+        selection.parse("id,password")
+    assert error.value.status_code == 400
+
+
+def test_adapter_cache_is_bounded():
+    selection = FieldSelection("product", FIELDS, max_adapters=4)
+    names = list(FIELDS)
+    requested = [selection.parse(",".join(names[:n])) for n in range(1, len(names) + 1)]
+
+    for fields in requested:
+        selection.adapter(fields)
+    assert len(selection.adapters) == 4
+    assert requested[0] not in selection.adapters
+
+    # Items trimmed with an evicted adapter still serialise with its replacement
+    items = selection.trim(requested[1], [{"id": "p1", "name": "Shirt", "category": "Shirts"}])
+    for fields in requested[2:]:
+        selection.adapter(fields)
+    assert selection.response(requested[1], items).body == b'[{"id":"p1","name":"Shirt"}]'
@@ -0,0 +1,62 @@
+import asyncio
+import io
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from PIL import Image
+
+from images import VARIANT_WIDTHS, ImagePipeline, image_srcset, render_variants, variant_formats, variant_url
+
+
+def png(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (120, 80, 40)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_variants_are_rendered_per_width_without_upscaling(tmp_path):
+    pipeline = ImagePipeline(tmp_path)
+    digest = pipeline.store_original(png(800, 400))
+    assert pipeline.store_original(png(800, 400)) == digest
+
+    rendered = render_variants(str(tmp_path), digest)
+
+    assert sorted((width, fmt) for width, fmt, _ in rendered) == sorted(
+        (width, fmt) for width in VARIANT_WIDTHS for fmt in variant_formats())
+    for width in VARIANT_WIDTHS:
+        with Image.open(pipeline.variant(digest, width, "webp")) as variant:
+            # Widths past the original's keep its size rather than being blown up
+            assert variant.size == ((width, width // 2) if width < 800 else (800, 400))
+
+
+def test_srcset_lists_every_width_for_uploads_and_unsplash():
+    digest = "a" * 64
+    assert image_srcset(variant_url(digest, 1280)) == ", ".join(
+        f"/api/images/{digest}/{width}.webp {width}w" for width in VARIANT_WIDTHS)
+
+    srcset = image_srcset("https://images.unsplash.com/photo-1?w=2000&q=80")
+    assert srcset.split(", ")[0] == "https://images.unsplash.com/photo-1?w=320&q=80&auto=format 320w"
+    assert len(srcset.split(", ")) == len(VARIANT_WIDTHS)
+
+    assert image_srcset("https://example.com/shirt.jpg") == ""
+
+
+def test_the_worker_pool_is_replaced_when_it_breaks(tmp_path):
+    pipeline = ImagePipeline(tmp_path, workers=1)
+    digest = pipeline.store_original(png(400, 400))
+
+    async def main():
+        await pipeline.render(digest)
+        with pytest.raises(BrokenProcessPool):
+            await asyncio.wrap_future(pipeline.executor.submit(os._exit, 1))
+        for path in (tmp_path / "variants").rglob("*.webp"):
+            path.unlink()
+
+        await pipeline.render(digest)
+
+    try:
+        asyncio.run(main())
+    finally:
+        pipeline.shutdown()
+    assert pipeline.variant(digest, 320, "webp").exists()
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+
+def test_enqueue_is_idempotent_per_dedupe_key(run_with_db):
+    from jobs import JobQueue
+
+    async def scenario(db):
+        calls = []
+
+        async def record(payload):
+            calls.append(payload)
+
+        queue = JobQueue(db)
+        queue.register("record", record)
+
+        first = await queue.enqueue("record", {"n": 1}, dedupe_key="record:1")
+        second = await queue.enqueue("record", {"n": 1}, dedupe_key="record:1")
+        await queue.run_pending()
+        await queue.enqueue("record", {"n": 1}, dedupe_key="record:1")
+        await queue.run_pending()
+
+        assert first == second
+        assert calls == [{"n": 1}]
+
+    run_with_db(scenario)
+
+
+def test_failed_jobs_are_retried_then_given_up(run_with_db):
+    from jobs import JobQueue
+
+    async def scenario(db):
+        attempts = []
+
+        async def flaky(payload):
+            attempts.append(payload)
+            if len(attempts) < 3:
+                raise RuntimeError("transient")
+
+        async def broken(payload):
+            raise RuntimeError("permanent")
+
+        queue = JobQueue(db, retry_delay=0, max_attempts=3)
+        queue.register("flaky", flaky)
+        queue.register("broken", broken)
+        flaky_id = await queue.enqueue("flaky", {})
+        broken_id = await queue.enqueue("broken", {})
+        for _ in range(4):
+            await queue.run_pending()
+
+        assert len(attempts) == 3
+        assert (await db.jobs.find_one({"_id": flaky_id}))["status"] == "done"
+        broken_job = await db.jobs.find_one({"_id": broken_id})
+        assert broken_job["status"] == "failed"
+        assert broken_job["attempts"] == 3
+        assert "permanent" in broken_job["error"]
+
+    run_with_db(scenario)
+
+
+def test_job_with_an_expired_lease_is_taken_over(run_with_db):
+    from jobs import JobQueue
+
+    async def scenario(db):
+        calls = []
+
+        async def record(payload):
+            calls.append(payload)
+
+        crashed = JobQueue(db, lease_seconds=0.2)
+        crashed.register("record", record)
+        survivor = JobQueue(db, lease_seconds=0.2)
+        survivor.register("record", record)
+
+        job_id = await crashed.enqueue("record", {"n": 1})
+        assert (await crashed.claim())["_id"] == job_id
+        assert await survivor.claim() is None
+
+        await asyncio.sleep(0.3)
+        assert await survivor.run_pending() == 1
+        assert calls == [{"n": 1}]
+
+    run_with_db(scenario)
+
+
+def test_product_deletion_cascade_removes_dead_references(run_with_server):
+    async def scenario(server):
+        db = server.db
+        await db.carts.insert_many([
+            {"user_id": "u1", "items": [{"product_id": "p1", "size": "M", "quantity": 1},
+                                        {"product_id": "p2", "size": "S", "quantity": 2}]},
+            {"user_id": "u2", "items": [{"product_id": "p2", "size": "M", "quantity": 1}]},
+        ])
+        await db.wishlists.insert_one({"user_id": "u1", "product_ids": ["p1", "p2"]})
+        await db.collections.insert_one({"id": "c1", "product_ids": ["p1", "p2"]})
+
+        await server.cascade_product_deletion({"product_ids": ["p1"]})
+        # Retries must be harmless
+        await server.cascade_product_deletion({"product_ids": ["p1"]})
+
+        carts = {c["user_id"]: c async for c in db.carts.find({}, {"_id": 0})}
+        assert [i["product_id"] for i in carts["u1"]["items"]] == ["p2"]
+        assert "updated_at" in carts["u1"] and "updated_at" not in carts["u2"]
+        assert (await db.wishlists.find_one({"user_id": "u1"}))["product_ids"] == ["p2"]
+        assert (await db.collections.find_one({"id": "c1"}))["product_ids"] == ["p2"]
+
+    run_with_server(scenario)
+
+
+def test_deleting_a_product_queues_its_cascade_once(run_with_server):
+    from fastapi import HTTPException
+
+    async def scenario(server):
+        admin = server.User(id="a1", email="admin@example.com", name="A", role="admin")
+        await server.db.products.insert_one({"id": "p1", "name": "Product 1"})
+
+        await server.delete_product("p1", admin)
+        with pytest.raises(HTTPException) as error:
+            await server.delete_product("p1", admin)
+
+        assert error.value.status_code == 404
+        jobs = await server.db.jobs.find({}, {"_id": 1, "payload": 1}).to_list(None)
+        assert jobs == [{"_id": "cascade_product_deletion:p1", "payload": {"product_ids": ["p1"]}}]
+
+    run_with_server(scenario)
@@ -0,0 +1,68 @@
+import pytest
+
+CATEGORIES = ["Shirts", "Jackets", "Dresses", "Sweaters"]
+PRODUCTS = 400
+LIMIT = 8
+
+FILTERS = [
+    {},
+    {"category": "Shirts"},
+    {"size": "M"},
+    {"availability": True},
+    {"min_price": 150, "max_price": 300},
+    {"category": "Dresses", "size": "S", "availability": True},
+    {"category": "Jackets", "min_price": 120},
+]
+
+
+def sample_product(i):
+    return {
+        "id": f"product-{i:04d}",
+        "name": f"Product {(i * 37) % PRODUCTS:04d}",
+        "description": "",
+        "price": 100 + (i * 13) % 250,
+        "category": CATEGORIES[i % len(CATEGORIES)],
+        "sizes": ["S", "M"] if i % 2 else ["L", "XL"],
+        "images": [],
+        "availability": i % 3 != 0,
+        "created_at": f"2026-01-01T00:00:{i % 60:02d}.{i:06d}+00:00",
+    }
+
+
+@pytest.fixture
+def run_with_catalog(run_with_server):
+    def run(scenario):
+        async def seeded(server):
+            await server.ensure_indexes()
+            await server.db.products.insert_many([sample_product(i) for i in range(PRODUCTS)])
+            await scenario(server)
+
+        run_with_server(seeded)
+
+    return run
+
+
+@pytest.mark.parametrize("sort", ["price_asc", "price_desc", "newest", "name"])
+def test_sorted_listings_use_an_index_without_a_sort_stage(sort, run_with_catalog, explain_stages):
+    async def scenario(server):
+        for filters in FILTERS:
+            query = server.product_query(**filters)
+            stages = await explain_stages(server.find_products(query, {"_id": 0}, sort, LIMIT))
+            assert "IXSCAN" in stages, (filters, stages)
+            assert "SORT" not in stages, (filters, stages)
+
+    run_with_catalog(scenario)
+
+
+@pytest.mark.parametrize("sort", ["price_asc", "price_desc", "newest", "name"])
+def test_sorted_listings_return_the_top_k_in_order(sort, run_with_catalog):
+    async def scenario(server):
+        field, direction = server.PRODUCT_SORTS[sort][0]
+        for filters in FILTERS:
+            query = server.product_query(**filters)
+            docs = await server.find_products(query, {"_id": 0}, sort, LIMIT).to_list(LIMIT)
+            everything = await server.db.products.find(query, {"_id": 0}).to_list(None)
+            expected = sorted(everything, key=lambda p: (p[field], p["id"]), reverse=direction < 0)[:LIMIT]
+            assert [p["id"] for p in docs] == [p["id"] for p in expected], filters
+
+    run_with_catalog(scenario)
@@ -0,0 +1,77 @@
+import random
+from collections import Counter
+from itertools import permutations
+
+import numpy as np
+
+from recommendations import PAIR_SHIFT, CooccurrenceRecommender, basket_pair_codes
+
+
+def pair_counts(recommender):
+    """The co-occurrence matrix keyed by product id, independent of index order."""
+    ids = recommender.product_ids
+    return {
+        (ids[int(code >> PAIR_SHIFT)], ids[int(code & 0xFFFFFFFF)]): int(count)
+        for code, count in zip(recommender.codes, recommender.counts)
+    }
+
+
+def popularity(recommender):
+    return {pid: int(n) for pid, n in zip(recommender.product_ids, recommender.popularity) if n}
+
+
+def expected_pairs(baskets):
+    counts = Counter()
+    for basket in baskets.values():
+        counts.update(permutations(sorted(set(basket)), 2))
+    return dict(counts)
+
+
+def test_pair_codes_cover_every_ordered_pair_within_each_basket():
+    items = np.array([0, 1, 2, 3, 4], dtype=np.int64)
+    lengths = np.array([3, 2], dtype=np.int64)
+
+    codes = basket_pair_codes(items, lengths)
+    pairs = sorted((int(c >> PAIR_SHIFT), int(c & 0xFFFFFFFF)) for c in codes)
+
+    assert pairs == sorted(list(permutations([0, 1, 2], 2)) + list(permutations([3, 4], 2)))
+    assert basket_pair_codes(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)).size == 0
+
+
+def test_incremental_updates_match_a_full_rebuild():
+    rng = random.Random(3)
+    catalog = [f"p{i}" for i in range(40)]
+    baskets = {f"u{u}": rng.sample(catalog, rng.randint(1, 6)) for u in range(200)}
+
+    incremental = CooccurrenceRecommender(top_k=5)
+    incremental.apply_baskets(baskets)
+    for _ in range(5):
+        changed = {u: rng.sample(catalog, rng.randint(0, 6)) for u in rng.sample(sorted(baskets), 30)}
+        incremental.apply_baskets(changed)
+        baskets.update(changed)
+
+    rebuilt = CooccurrenceRecommender(top_k=5)
+    rebuilt.apply_baskets({u: b for u, b in baskets.items() if b})
+
+    assert pair_counts(incremental) == pair_counts(rebuilt) == expected_pairs(baskets)
+    assert popularity(incremental) == popularity(rebuilt)
+    assert set(incremental.baskets) == {u for u, b in baskets.items() if b}
+
+
+def test_related_ranks_by_normalised_co_occurrence():
+    recommender = CooccurrenceRecommender(top_k=2)
+    recommender.apply_baskets({
+        "u1": ["shirt", "tie"],
+        "u2": ["shirt", "tie"],
+        "u3": ["shirt", "socks"],
+        "u4": ["socks", "shoes"],
+        "u5": ["socks", "belt"],
+    })
+
+    assert recommender.related("shirt") == ["tie", "socks"]
+    assert recommender.related("shirt", limit=1) == ["tie"]
+    assert recommender.related("unknown") == []
+
+    recommender.apply_baskets({"u1": [], "u2": []})
+    assert recommender.related("shirt") == ["socks"]
+    assert recommender.related("tie") == []
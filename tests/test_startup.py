@@ -0,0 +1,31 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1] / "backend"
+
+DEFERRED = ["motor", "pymongo", "jose", "passlib", "PIL", "numpy", "recommendations"]
+
+PROBE = f"""
+import json, sys
+import server
+app = server.create_app()
+print(json.dumps({{
+    "loaded": [name for name in {DEFERRED!r} if name in sys.modules],
+    "client": server.db._client is not None,
+    "routes": sorted(route.path for route in app.routes if route.path.startswith("/api/")),
+}}))
+"""
+
+
+def test_importing_the_server_defers_the_database_and_heavy_libraries():
+    env = {key: value for key, value in os.environ.items() if key not in ("MONGO_URL", "DB_NAME")}
+    result = subprocess.run([sys.executable, "-c", PROBE], cwd=BACKEND, env=env,
+                            capture_output=True, text=True, check=True)
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert probe["loaded"] == []
+    assert probe["client"] is False
+    assert "/api/products" in probe["routes"]